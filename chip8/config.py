@@ -36,10 +36,20 @@ KEY_MAPPINGS = {
     0xF: pygame.K_v,
 }
 
+# The keyboard keys for each of the Chip 8 keys, indexed by the Chip 8 key
+KEY_MAPPINGS_TABLE = tuple(KEY_MAPPINGS[chip8_key] for chip8_key in range(0x10))
+
+# The Chip 8 key for each of the keyboard keys
+CHIP8_KEYS = {keyboard_key: chip8_key for chip8_key, keyboard_key in KEY_MAPPINGS.items()}
+
 # The font file to use
 FONT_FILE = "FONTS.chip8"
 
 # Delay timer decrement interval (in ms)
 DELAY_INTERVAL = 17
 
+# How often the emulator stops executing instructions to process window and
+# keyboard events (in ns)
+EVENT_POLL_INTERVAL = 1_000_000
+
 # E N D   O F   F I L E #######################################################
@@ -8,12 +8,12 @@ A Chip 8 CPU - see the README file for more information.
 
 import numpy as np
 
+from os import urandom
 from pygame import key
 from pygame import mixer
 from pygame.mixer import Sound
-from random import randint
 
-from chip8.config import STACK_POINTER_START, KEY_MAPPINGS, PROGRAM_COUNTER_START
+from chip8.config import STACK_POINTER_START, KEY_MAPPINGS_TABLE, CHIP8_KEYS, PROGRAM_COUNTER_START
 
 # C O N S T A N T S ###########################################################
 
@@ -45,6 +45,20 @@ MIN_AUDIO_SAMPLES = 3200
 # The audio playback rate to use for Pygame mixer initialization
 PYGAME_AUDIO_PLAYBACK_RATE = 48000
 
+# The number of random bytes to generate at once for the RAND instruction
+RANDOM_BUFFER_SIZE = 4096
+
+# The hundreds, tens and ones digits of every value a register can hold
+BCD_TABLE = tuple(bytes((value // 100, value // 10 % 10, value % 10)) for value in range(256))
+
+# The format of the CPU state string, with one field per register so that the
+# whole string can be built with a single format call
+STATE_FORMAT = (
+    "PC:{pc:04X} OP:{operand:04X} " +
+    "".join(f"V{register:X}:{{v[{register}]:02X}} " for register in range(NUM_REGISTERS)) +
+    "I:{index:04X} DELAY:{delay} SOUND:{sound} {last_op}"
+)
+
 # C L A S S E S ###############################################################
 
 
@@ -76,6 +90,19 @@ class Chip8CPU:
 
     ** VF is a special register - it is used to store the overflow bit
     """
+    __slots__ = (
+        "last_pc", "last_op", "sound", "delay", "v", "pc", "sp", "index",
+        "rpl", "pitch", "playback_rate", "audio_pattern_buffer",
+        "sound_playing", "sound_waveform", "bitplane", "shift_quirks",
+        "index_quirks", "jump_quirks", "clip_quirks", "logic_quirks",
+        "awaiting_keypress", "keypress_register", "keys_pressed",
+        "operation_lookup", "save_skip_lookup", "clear_routines",
+        "logical_operation_lookup", "misc_routine_lookup", "_operand", "x",
+        "y", "n", "nn", "nnn", "mode",
+        "screen", "memory", "stack", "decode_cache", "running",
+        "random_bytes", "random_index", "trace",
+    )
+
     def __init__(
             self,
             screen,
@@ -84,7 +111,8 @@ class Chip8CPU:
             jump_quirks=False,
             clip_quirks=False,
             logic_quirks=False,
-            mem_size="64K"
+            mem_size="64K",
+            trace=False
     ):
         """
         Initialize the Chip8 CPU. The only required parameter is a screen
@@ -98,16 +126,18 @@ class Chip8CPU:
         :param clip_quirks: enables screen clipping quirks
         :param logic_quirks: enables logic quirks
         :param mem_size: sets the maximum memory available "4K" or "64K"
+        :param trace: enables recording a description of each instruction
         """
+        self.trace = trace
         self.last_pc = 0x0000
         self.last_op = "None"
         self.sound = 0
         self.delay = 0
-        self.v = [0] * NUM_REGISTERS
+        self.v = bytearray(NUM_REGISTERS)
         self.pc = PROGRAM_COUNTER_START
         self.sp = STACK_POINTER_START
         self.index = 0
-        self.rpl = [0] * NUM_REGISTERS
+        self.rpl = bytearray(NUM_REGISTERS)
 
         self.pitch = 64
         self.playback_rate = 4000
@@ -126,10 +156,19 @@ class Chip8CPU:
         self.awaiting_keypress = False
         self.keypress_register = None
 
+        # Random bytes for the RAND instruction are generated in bulk and
+        # consumed one at a time, refilling once they have all been used
+        self.random_bytes = urandom(RANDOM_BUFFER_SIZE)
+        self.random_index = 0
+
+        # The state of the keyboard as of the last time events were pumped.
+        # When this is None, the keyboard is read on every keyboard routine
+        self.keys_pressed = None
+
         # The operation_lookup table is executed according to the most
         # significant byte of the operand (e.g. operand 8nnn would call
         # self.execute_logical_instruction)
-        self.operation_lookup = {
+        operations = {
             0x0: self.clear_return,                  # 0nnn - SYS  nnn
             0x1: self.jump_to_address,               # 1nnn - JUMP nnn
             0x2: self.jump_to_subroutine,            # 2nnn - CALL nnn
@@ -147,14 +186,24 @@ class Chip8CPU:
             0xE: self.keyboard_routines,             # see subfunctions below
             0xF: self.misc_routines,                 # see subfunctions below
         }
+        self.operation_lookup = tuple(operations[operation] for operation in range(0x10))
 
-        self.save_skip_lookup = {
+        # The 5xyn, 00nn and 8xyn groups are looked up by tuples indexed by
+        # the low nibble or low byte of the operand, with None for unknown
+        # operations (see misc_routines below)
+        save_skip_routines = {
             0x0: self.skip_if_reg_equal_reg,         # 5xy0 - SKE  Vx, Vy
             0x2: self.store_subset_regs_in_memory,   # 5xy2 - STORSUB x, y
             0x3: self.read_subset_regs_in_memory,    # 5xy3 - LOADSUB x, y
         }
-
-        self.clear_routines = {
+        self.save_skip_lookup = tuple(save_skip_routines.get(operation) for operation in range(0x10))
+
+        # The scroll down (00Cn) and scroll up (00Dn) routines take the number
+        # of lines to scroll from the low nibble, so every value of n maps to
+        # the same routine
+        clear_routines = {
+            **{0xC0 + lines: self.scroll_down for lines in range(0x10)},   # 00Cn - SCD  n
+            **{0xD0 + lines: self.scroll_up for lines in range(0x10)},     # 00Dn - SCU  n
             0xE0: self.clear_screen,                 # 00E0 - CLS
             0xEE: self.return_from_subroutine,       # 00EE - RTS
             0xFB: self.scroll_right,                 # 00FB - SCRR
@@ -163,11 +212,12 @@ class Chip8CPU:
             0xFE: self.disable_extended_mode,        # 00FE - SET NORMAL
             0xFF: self.enable_extended_mode,         # 00FF - SET EXTENDED
         }
+        self.clear_routines = tuple(clear_routines.get(operation) for operation in range(0x100))
 
         # This set of operations is invoked when the operand loaded into the
         # CPU starts with 8 (e.g. operand 8nn0 would call
         # self.move_reg_into_reg)
-        self.logical_operation_lookup = {
+        logical_operations = {
             0x0: self.move_reg_into_reg,             # 8st0 - LOAD Vs, Vt
             0x1: self.logical_or,                    # 8st1 - OR   Vs, Vt
             0x2: self.logical_and,                   # 8st2 - AND  Vs, Vt
@@ -178,11 +228,13 @@ class Chip8CPU:
             0x7: self.subtract_reg_from_reg1,        # 8st7 - SUBN Vs, Vt
             0xE: self.left_shift_reg,                # 8stE - SHL  Vs
         }
+        self.logical_operation_lookup = tuple(logical_operations.get(operation) for operation in range(0x10))
 
         # This set of operations is invoked when the operand loaded into the
         # CPU starts with F (e.g. operand Fn07 would call
-        # self.move_delay_timer_into_reg)
-        self.misc_routine_lookup = {
+        # self.move_delay_timer_into_reg). The lookup is a tuple indexed by
+        # the low byte of the operand, with None for unknown operations
+        misc_routines = {
             0x00: self.index_load_long,                      # F000 - LOADLONG
             0x01: self.set_bitplane,                         # Fn01 - BITPLANE n
             0x02: self.load_audio_pattern_buffer,            # F002 - AUDIO
@@ -200,21 +252,63 @@ class Chip8CPU:
             0x75: self.store_regs_in_rpl,                    # Fs75 - SRPL Vs
             0x85: self.read_regs_from_rpl,                   # Fs85 - LRPL Vs
         }
+        self.misc_routine_lookup = tuple(misc_routines.get(operation) for operation in range(0x100))
         self.operand = 0
         self.mode = MODE_NORMAL
         self.screen = screen
+
+        # Memory is allocated once and never resized. The views over it
+        # below (and in the sprite routines) rely on its buffer staying put
         self.memory = bytearray(MEM_SIZE[mem_size])
+
+        # A little-endian 16-bit view over memory, used to push and pop
+        # program counter values on the stack with a single access. The
+        # stack pointer always starts on a 2-byte boundary, so the word
+        # at stack[sp >> 1] is the 2 bytes at memory[sp] and memory[sp + 1]
+        self.stack = np.frombuffer(self.memory, dtype="<u2")
+
+        # The decode cache holds the decoded instruction for every program
+        # counter value that has been executed. Entries are the tuples
+        # returned by decode(), and are cleared whenever the memory they were
+        # decoded from is written to
+        self.decode_cache = [None] * len(self.memory)
         self.reset()
         self.running = True
         mixer.init(frequency=PYGAME_AUDIO_PLAYBACK_RATE, size=8, channels=1)
 
     def __str__(self):
-        val = f"PC:{self.last_pc:04X} OP:{self.operand:04X} "
-        for index in range(0x10):
-            val += f"V{index:X}:{self.v[index]:02X} "
-        val += f"I:{self.index:04X} DELAY:{self.delay} SOUND:{self.sound} "
-        val += f"{self.last_op}"
-        return val
+        return STATE_FORMAT.format(
+            pc=self.last_pc, operand=self.operand, v=self.v, index=self.index,
+            delay=self.delay, sound=self.sound, last_op=self.last_op)
+
+    @property
+    def operand(self):
+        """
+        Returns the operand currently being executed.
+
+        :return: the current operand
+        """
+        return self._operand
+
+    @operand.setter
+    def operand(self, operand):
+        """
+        Sets the operand to execute, and decodes the fields that handlers use
+        from it. The fields of the operand are as follows:
+
+           Bits:  15-12     11-8      7-4       3-0
+                  unused     x         y         n
+                  unused     x        nn        nn
+                  unused    nnn       nnn       nnn
+
+        :param operand: the operand to execute
+        """
+        self._operand = operand
+        self.x = (operand & 0x0F00) >> 8
+        self.y = (operand & 0x00F0) >> 4
+        self.n = operand & 0x000F
+        self.nn = operand & 0x00FF
+        self.nnn = operand & 0x0FFF
 
     def execute_instruction(self, operand=None):
         """
@@ -226,28 +320,97 @@ class Chip8CPU:
         :param operand: the operand to execute
         :return: returns the operand executed
         """
-        self.last_pc = self.pc
+        pc = self.pc
+        if self.trace:
+            self.last_pc = pc
         if operand:
             self.operand = operand
+            self.operation_lookup[(operand & 0xF000) >> 12]()
+            return operand
+
+        entry = self.decode_cache[pc]
+        if entry is None:
+            entry = self.decode(pc)
+            self.decode_cache[pc] = entry
+        handler, self._operand, self.x, self.y, self.n, self.nn, self.nnn = entry
+        self.pc = pc + 2
+        handler()
+        return entry[1]
+
+    def decode(self, address):
+        """
+        Decodes the instruction stored at the specified memory address,
+        returning a tuple of the handler for the instruction, the operand
+        itself, and the x, y, n, nn and nnn fields of the operand. For the
+        operation groups that have subfunctions (0nnn, 5xyn, 8xyn and Fxnn),
+        the handler is the subfunction itself, so that executing a cached
+        instruction only takes a single dispatch. Unknown subfunctions are
+        left to the group routine, which raises the exception.
+
+        :param address: the memory address of the instruction to decode
+        :return: a tuple of (handler, operand, x, y, n, nn, nnn)
+        """
+        operand = (self.memory[address] << 8) | self.memory[address + 1]
+        operation = (operand & 0xF000) >> 12
+        n = operand & 0x000F
+        nn = operand & 0x00FF
+        handler = self.operation_lookup[operation]
+        if operation == 0x0:
+            routine = self.clear_routines[nn]
+        elif operation == 0x5:
+            routine = self.save_skip_lookup[n]
+        elif operation == 0x8:
+            routine = self.logical_operation_lookup[n]
+        elif operation == 0xF:
+            routine = self.misc_routine_lookup[nn]
         else:
-            self.operand = int(self.memory[self.pc])
-            self.operand = self.operand << 8
-            self.operand += int(self.memory[self.pc + 1])
-            self.pc += 2
-        operation = (self.operand & 0xF000) >> 12
-        self.operation_lookup[operation]()
-        return self.operand
+            routine = None
+        return (
+            routine or handler,
+            operand,
+            (operand & 0x0F00) >> 8,
+            (operand & 0x00F0) >> 4,
+            n,
+            nn,
+            operand & 0x0FFF,
+        )
+
+    def invalidate_decode_cache(self, start, end):
+        """
+        Clears any decoded instructions that overlap the memory between
+        start (inclusive) and end (exclusive). Since instructions are two
+        bytes long, the decoded entry that begins one byte before start is
+        also cleared.
+
+        :param start: the first memory address that was written
+        :param end: the address one past the last memory address written
+        """
+        start = max(start - 1, 0)
+        end = min(end, len(self.decode_cache))
+        self.decode_cache[start:end] = [None] * (end - start)
+
+    def check_memory_range(self, start, end):
+        """
+        Makes sure that a block of memory lies entirely inside memory before
+        registers are copied to or from it. Slice copies never fail on their
+        own: a short read would shrink the registers, and a long write would
+        grow memory.
+
+        :param start: the first memory address to access
+        :param end: the address one past the last memory address to access
+        """
+        if end > len(self.memory):
+            raise IndexError(f"memory access out of range: {start:04X}-{end - 1:04X}")
 
     def execute_logical_instruction(self):
         """
         Execute the logical instruction based upon the current operand.
         For testing purposes, pass the operand directly to the function.
         """
-        operation = self.operand & 0x000F
-        try:
-            self.logical_operation_lookup[operation]()
-        except KeyError:
+        routine = self.logical_operation_lookup[self.n]
+        if routine is None:
             raise UnknownOpCodeException(self.operand)
+        routine()
 
     def keyboard_routines(self):
         """
@@ -266,22 +429,18 @@ class Chip8CPU:
            Bits:  15-12    11-8      7-4      3-0
                     E        x      9 or A    E or 1
         """
-        operation = self.operand & 0x00FF
-        x = (self.operand & 0x0F00) >> 8
+        operation = self.nn
+        x = self.x
 
         key_to_check = self.v[x]
-        keys_pressed = key.get_pressed()
-
-        # Skip if the key specified in the source register is pressed
-        if operation == 0x9E:
-            if key_to_check <= 0xF and keys_pressed[KEY_MAPPINGS[key_to_check]]:
-                self.pc += 2
-                if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
-                    self.pc += 2
-
-        # Skip if the key specified in the source register is not pressed
-        if operation == 0xA1:
-            if key_to_check <= 0xF and  not keys_pressed[KEY_MAPPINGS[key_to_check]]:
+        keys_pressed = self.keys_pressed
+        if keys_pressed is None:
+            keys_pressed = key.get_pressed()
+
+        # Skip if the key specified in the source register is pressed (9E) or
+        # is not pressed (A1)
+        if key_to_check <= 0xF and (operation == 0x9E or operation == 0xA1):
+            if bool(keys_pressed[KEY_MAPPINGS_TABLE[key_to_check]]) == (operation == 0x9E):
                 self.pc += 2
                 if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
                     self.pc += 2
@@ -290,42 +449,51 @@ class Chip8CPU:
         """
         Will execute either a register save or skip routine.
         """
-        operation = self.operand & 0x000F
-        try:
-            self.save_skip_lookup[operation]()
-        except KeyError:
+        routine = self.save_skip_lookup[self.n]
+        if routine is None:
             raise UnknownOpCodeException(self.operand)
+        routine()
 
     def misc_routines(self):
         """
         Will execute one of the routines specified in misc_routines.
         """
-        operation = self.operand & 0x00FF
-        try:
-            self.misc_routine_lookup[operation]()
-        except KeyError:
+        routine = self.misc_routine_lookup[self.nn]
+        if routine is None:
             raise UnknownOpCodeException(self.operand)
+        routine()
 
     def clear_return(self):
         """
         Opcodes starting with a 0 usually correspond to screen clearing or scrolling
         routines, or emulator exit routines.
         """
-        operation = self.operand & 0x00FF
-        sub_operation = operation & 0x00F0
-        if sub_operation == 0x00C0:
-            num_lines = self.operand & 0x000F
-            self.screen.scroll_down(num_lines, self.bitplane)
+        routine = self.clear_routines[self.nn]
+        if routine is None:
+            raise UnknownOpCodeException(self.operand)
+        routine()
+
+    def scroll_down(self):
+        """
+        00Cn - SCD n
+
+        Scrolls the screen down by n lines.
+        """
+        num_lines = self.n
+        self.screen.scroll_down(num_lines, self.bitplane)
+        if self.trace:
             self.last_op = f"Scroll Down {num_lines:01X}"
-        elif sub_operation == 0x00D0:
-            num_lines = self.operand & 0x000F
-            self.screen.scroll_up(num_lines, self.bitplane)
+
+    def scroll_up(self):
+        """
+        00Dn - SCU n
+
+        Scrolls the screen up by n lines.
+        """
+        num_lines = self.n
+        self.screen.scroll_up(num_lines, self.bitplane)
+        if self.trace:
             self.last_op = f"Scroll Up {num_lines:01X}"
-        else:
-            try:
-                self.clear_routines[operation]()
-            except KeyError:
-                raise UnknownOpCodeException(self.operand)
 
     def clear_screen(self):
         """
@@ -334,7 +502,8 @@ class Chip8CPU:
         Clears the screen
         """
         self.screen.clear_screen(self.bitplane)
-        self.last_op = "CLS"
+        if self.trace:
+            self.last_op = "CLS"
 
     def return_from_subroutine(self):
         """
@@ -343,11 +512,10 @@ class Chip8CPU:
         Return from subroutine. Pop the current value in the stack pointer
         off of the stack, and set the program counter to the value popped.
         """
-        self.sp -= 1
-        self.pc = self.memory[self.sp] << 8
-        self.sp -= 1
-        self.pc += self.memory[self.sp]
-        self.last_op = "RTS"
+        self.sp -= 2
+        self.pc = int(self.stack[self.sp >> 1])
+        if self.trace:
+            self.last_op = "RTS"
 
     def scroll_right(self):
         """
@@ -356,7 +524,8 @@ class Chip8CPU:
         Scrolls the screen right by 4 pixels.
         """
         self.screen.scroll_right(self.bitplane)
-        self.last_op = "Scroll Right"
+        if self.trace:
+            self.last_op = "Scroll Right"
 
     def scroll_left(self):
         """
@@ -365,7 +534,8 @@ class Chip8CPU:
         Scrolls the screen left by 4 pixels.
         """
         self.screen.scroll_left(self.bitplane)
-        self.last_op = "Scroll Left"
+        if self.trace:
+            self.last_op = "Scroll Left"
 
     def exit(self):
         """
@@ -374,7 +544,8 @@ class Chip8CPU:
         Exits the emulator.
         """
         self.running = False
-        self.last_op = "EXIT"
+        if self.trace:
+            self.last_op = "EXIT"
 
     def disable_extended_mode(self):
         """
@@ -384,7 +555,8 @@ class Chip8CPU:
         """
         self.screen.set_normal()
         self.mode = MODE_NORMAL
-        self.last_op = "Set Normal Mode"
+        if self.trace:
+            self.last_op = "Set Normal Mode"
 
     def enable_extended_mode(self):
         """
@@ -394,7 +566,8 @@ class Chip8CPU:
         """
         self.screen.set_extended()
         self.mode = MODE_EXTENDED
-        self.last_op = "Set Extended Mode"
+        if self.trace:
+            self.last_op = "Set Extended Mode"
 
     def jump_to_address(self):
         """
@@ -406,8 +579,9 @@ class Chip8CPU:
            Bits:  15-12   11-8   7-4   3-0
                     1      n      n     n
         """
-        self.pc = self.operand & 0x0FFF
-        self.last_op = f"JUMP {self.pc:04X}"
+        self.pc = self.nnn
+        if self.trace:
+            self.last_op = f"JUMP {self.pc:04X}"
 
     def jump_to_subroutine(self):
         """
@@ -419,12 +593,12 @@ class Chip8CPU:
            Bits:  15-12    11-8   7-4   3-0
                     2        n     n     n
         """
-        self.memory[self.sp] = self.pc & 0x00FF
-        self.sp += 1
-        self.memory[self.sp] = (self.pc & 0xFF00) >> 8
-        self.sp += 1
-        self.pc = self.operand & 0x0FFF
-        self.last_op = f"CALL {self.pc:04X}"
+        self.stack[self.sp >> 1] = self.pc & 0xFFFF
+        self.sp += 2
+        self.invalidate_decode_cache(self.sp - 2, self.sp)
+        self.pc = self.nnn
+        if self.trace:
+            self.last_op = f"CALL {self.pc:04X}"
 
     def skip_if_reg_equal_val(self):
         """
@@ -439,12 +613,13 @@ class Chip8CPU:
         The program counter is updated to skip the next instruction by
         advancing it by 2 bytes.
         """
-        x = (self.operand & 0x0F00) >> 8
-        if self.v[x] == (self.operand & 0x00FF):
+        x = self.x
+        if self.v[x] == self.nn:
             self.pc += 2
             if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
                 self.pc += 2
-        self.last_op = f"SKE V{x:01X}, {self.operand & 0x00FF:02X}"
+        if self.trace:
+            self.last_op = f"SKE V{x:01X}, {self.nn:02X}"
 
     def skip_if_reg_not_equal_val(self):
         """
@@ -459,9 +634,10 @@ class Chip8CPU:
         The program counter is updated to skip the next instruction by
         advancing it by 2 bytes.
         """
-        x = (self.operand & 0x0F00) >> 8
-        self.last_op = f"SKNE V{x:X}, {self.operand & 0x00FF:02X} (comparing {self.v[x]:02X} to {self.operand & 0xFF:02X})"
-        if self.v[x] != (self.operand & 0x00FF):
+        x = self.x
+        if self.trace:
+            self.last_op = f"SKNE V{x:X}, {self.nn:02X} (comparing {self.v[x]:02X} to {self.nn:02X})"
+        if self.v[x] != self.nn:
             self.pc += 2
             if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
                 self.pc += 2
@@ -479,13 +655,14 @@ class Chip8CPU:
         The program counter is updated to skip the next instruction by
         advancing it by 2 bytes.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         if self.v[x] == self.v[y]:
             self.pc += 2
             if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
                 self.pc += 2
-        self.last_op = f"SKE V{x:01X}, V{y:01X}"
+        if self.trace:
+            self.last_op = f"SKE V{x:01X}, V{y:01X}"
 
     def store_subset_regs_in_memory(self):
         """
@@ -499,19 +676,20 @@ class Chip8CPU:
 
         If x is larger than y, then they will be stored in reverse order.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        pointer = 0
+        x = self.x
+        y = self.y
+        index = self.index
         if y >= x:
-            for z in range(x, y+1):
-                self.memory[self.index + pointer] = self.v[z]
-                pointer += 1
+            registers = self.v[x:y + 1]
         else:
-            for z in range(x, y-1, -1):
-                self.memory[self.index + pointer] = self.v[z]
-                pointer += 1
+            registers = self.v[y:x + 1][::-1]
+        count = len(registers)
+        self.check_memory_range(index, index + count)
+        self.memory[index:index + count] = registers
+        self.invalidate_decode_cache(index, index + count)
 
-        self.last_op = f"STORSUB [I], {x:01X}, {y:01X}"
+        if self.trace:
+            self.last_op = f"STORSUB [I], {x:01X}, {y:01X}"
 
     def read_subset_regs_in_memory(self):
         """
@@ -525,19 +703,17 @@ class Chip8CPU:
 
         If x is larger than y, then they will be loaded in reverse order.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        pointer = 0
+        x = self.x
+        y = self.y
+        index = self.index
+        self.check_memory_range(index, index + abs(x - y) + 1)
         if y >= x:
-            for z in range(x, y+1):
-                self.v[z] = self.memory[self.index + pointer]
-                pointer += 1
+            self.v[x:y + 1] = self.memory[index:index + y - x + 1]
         else:
-            for z in range(x, y-1, -1):
-                self.v[z] = self.memory[self.index + pointer]
-                pointer += 1
+            self.v[y:x + 1] = self.memory[index:index + x - y + 1][::-1]
 
-        self.last_op = f"LOADSUB [I], {x:01X}, {y:01X}"
+        if self.trace:
+            self.last_op = f"LOADSUB [I], {x:01X}, {y:01X}"
 
     def move_value_to_reg(self):
         """
@@ -549,9 +725,10 @@ class Chip8CPU:
            Bits:  15-12    11-8    7-4   3-0
                     6       x       n     n
         """
-        x = (self.operand & 0x0F00) >> 8
-        self.v[x] = self.operand & 0x00FF
-        self.last_op = f"LOAD V{x:X}, {self.operand & 0x00FF:02X}"
+        x = self.x
+        self.v[x] = self.nn
+        if self.trace:
+            self.last_op = f"LOAD V{x:X}, {self.nn:02X}"
 
     def add_value_to_reg(self):
         """
@@ -563,9 +740,10 @@ class Chip8CPU:
            Bits:  15-12     11-8    7-4    3-0
                     7         x      n      n
          """
-        x = (self.operand & 0x0F00) >> 8
-        self.v[x] = (self.v[x] + (self.operand & 0x00FF)) % 256
-        self.last_op = f"ADD V{x:01X}, {self.operand & 0x00FF:02X}"
+        x = self.x
+        self.v[x] = (self.v[x] + self.nn) & 0xFF
+        if self.trace:
+            self.last_op = f"ADD V{x:01X}, {self.nn:02X}"
 
     def move_reg_into_reg(self):
         """
@@ -578,10 +756,11 @@ class Chip8CPU:
            Bits:  15-12   11-8    7-4    3-0
                     8       x      y      0
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         self.v[x] = self.v[y]
-        self.last_op = f"LOAD V{x:01X}, V{y:01X}"
+        if self.trace:
+            self.last_op = f"LOAD V{x:01X}, V{y:01X}"
 
     def logical_or(self):
         """
@@ -594,12 +773,13 @@ class Chip8CPU:
            Bits:  15-12    11-8   7-4    3-0
                     8       x      y      1
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         self.v[x] |= self.v[y]
         if self.logic_quirks:
             self.v[0xF] = 0
-        self.last_op = f"OR V{x:01X}, V{y:01X}"
+        if self.trace:
+            self.last_op = f"OR V{x:01X}, V{y:01X}"
 
     def logical_and(self):
         """
@@ -612,12 +792,13 @@ class Chip8CPU:
            Bits:  15-12   11-8   7-4   3-0
                     8       x     y     2
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         self.v[x] &= self.v[y]
         if self.logic_quirks:
             self.v[0xF] = 0
-        self.last_op = f"AND V{x:01X}, V{y:01X}"
+        if self.trace:
+            self.last_op = f"AND V{x:01X}, V{y:01X}"
 
     def exclusive_or(self):
         """
@@ -630,12 +811,13 @@ class Chip8CPU:
            Bits:  15-12   11-8   7-4   3-0
                     8       x     y     3
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         self.v[x] ^= self.v[y]
         if self.logic_quirks:
             self.v[0xF] = 0
-        self.last_op = f"XOR V{x:01X}, V{y:01X}"
+        if self.trace:
+            self.last_op = f"XOR V{x:01X}, V{y:01X}"
 
     def add_reg_to_reg(self):
         """
@@ -650,12 +832,13 @@ class Chip8CPU:
 
         If a carry is generated, set a carry flag in register VF.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        carry = 1 if self.v[x] + self.v[y] > 255 else 0
-        self.v[x] = (self.v[x] + self.v[y]) % 256
-        self.v[0xF] = carry
-        self.last_op = f"ADD V{x:01X}, V{y:01X}"
+        x = self.x
+        y = self.y
+        total = self.v[x] + self.v[y]
+        self.v[x] = total & 0xFF
+        self.v[0xF] = total >> 8
+        if self.trace:
+            self.last_op = f"ADD V{x:01X}, V{y:01X}"
 
     def subtract_reg_from_reg(self):
         """
@@ -670,12 +853,14 @@ class Chip8CPU:
 
         If a borrow is generated, set a carry flag in register VF.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        borrow = 1 if self.v[x] >= self.v[y] else 0
-        self.v[x] = self.v[x] - self.v[y] if self.v[x] >= self.v[y] else 256 + self.v[x] - self.v[y]
-        self.v[0xF] = borrow
-        self.last_op = f"SUB V{x:01X}, V{y:01X}"
+        x = self.x
+        y = self.y
+        difference = self.v[x] - self.v[y]
+        self.v[x] = difference & 0xFF
+        # difference >> 8 is -1 when a borrow is generated, and 0 otherwise
+        self.v[0xF] = (difference >> 8) + 1
+        if self.trace:
+            self.last_op = f"SUB V{x:01X}, V{y:01X}"
 
     def right_shift_reg(self):
         """
@@ -691,18 +876,13 @@ class Chip8CPU:
         If shift_quirks mode is enabled, then register x will be bit shifted and
         stored in x.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        if self.shift_quirks:
-            bit_one = self.v[x] & 0x1
-            self.v[x] = self.v[x] >> 1
-            self.v[0xF] = bit_one
-            self.last_op = f"SHR V{x:01X}"
-        else:
-            bit_one = self.v[y] & 0x1
-            self.v[x] = self.v[y] >> 1
-            self.v[0xF] = bit_one
-            self.last_op = f"SHR V{x:01X}, V{y:01X}"
+        x = self.x
+        y = self.y
+        value = self.v[x] if self.shift_quirks else self.v[y]
+        self.v[x] = value >> 1
+        self.v[0xF] = value & 0x1
+        if self.trace:
+            self.last_op = f"SHR V{x:01X}" if self.shift_quirks else f"SHR V{x:01X}, V{y:01X}"
 
     def subtract_reg_from_reg1(self):
         """
@@ -717,12 +897,13 @@ class Chip8CPU:
 
         If a borrow is NOT generated, set a carry flag in register VF.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        not_borrow = 1 if self.v[y] >= self.v[x] else 0
-        self.last_op = f"SUBN V{x:01X} ({self.v[x]:02X}), V{y:01X} ({self.v[y]:02X})"
-        self.v[x] = self.v[y] - self.v[x] if self.v[y] >= self.v[x] else 256 + self.v[y] - self.v[x]
-        self.v[0xF] = not_borrow
+        x = self.x
+        y = self.y
+        difference = self.v[y] - self.v[x]
+        if self.trace:
+            self.last_op = f"SUBN V{x:01X} ({self.v[x]:02X}), V{y:01X} ({self.v[y]:02X})"
+        self.v[x] = difference & 0xFF
+        self.v[0xF] = (difference >> 8) + 1
 
     def left_shift_reg(self):
         """
@@ -738,18 +919,13 @@ class Chip8CPU:
         if shift_quirks is set, then the source and destination register
         will always be x.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
-        if self.shift_quirks:
-            bit_seven = (self.v[x] & 0x80) >> 7
-            self.v[x] = (self.v[x] << 1) & 0xFF
-            self.v[0xF] = bit_seven
-            self.last_op = f"SHL V{x:01X}"
-        else:
-            bit_seven = (self.v[y] & 0x80) >> 7
-            self.v[x] = (self.v[y] << 1) & 0xFF
-            self.v[0xF] = bit_seven
-            self.last_op = f"SHL V{x:01X}, V{y:01X}"
+        x = self.x
+        y = self.y
+        value = self.v[x] if self.shift_quirks else self.v[y]
+        self.v[x] = (value << 1) & 0xFF
+        self.v[0xF] = value >> 7
+        if self.trace:
+            self.last_op = f"SHL V{x:01X}" if self.shift_quirks else f"SHL V{x:01X}, V{y:01X}"
 
     def skip_if_reg_not_equal_reg(self):
         """
@@ -764,13 +940,14 @@ class Chip8CPU:
         The program counter is updated to skip the next instruction by
         advancing it by 2 bytes.
         """
-        x = (self.operand & 0x0F00) >> 8
-        y = (self.operand & 0x00F0) >> 4
+        x = self.x
+        y = self.y
         if self.v[x] != self.v[y]:
             self.pc += 2
             if self.memory[self.pc - 2] == 0xF0 and self.memory[self.pc - 1] == 0x00:
                 self.pc += 2
-        self.last_op = f"SKNE V{x:01X}, V{y:01X} (comparing {self.v[x]:02X} to {self.v[y]:02X})"
+        if self.trace:
+            self.last_op = f"SKNE V{x:01X}, V{y:01X} (comparing {self.v[x]:02X} to {self.v[y]:02X})"
 
     def load_index_reg_with_value(self):
         """
@@ -782,8 +959,9 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     A         n        n         n
         """
-        self.index = self.operand & 0x0FFF
-        self.last_op = f"LOAD I, {self.index:03X}"
+        self.index = self.nnn
+        if self.trace:
+            self.last_op = f"LOAD I, {self.index:03X}"
 
     def jump_to_register_plus_value(self):
         """
@@ -804,12 +982,14 @@ class Chip8CPU:
                     B         x        n         n
         """
         if self.jump_quirks:
-            x = (self.operand & 0x0F00) >> 8
-            self.pc = self.v[x] + (self.operand & 0x00FF)
-            self.last_op = f"JUMP V{x:01X} + {self.operand & 0x0FF:03X}"
+            x = self.x
+            self.pc = self.v[x] + self.nn
+            if self.trace:
+                self.last_op = f"JUMP V{x:01X} + {self.nn:03X}"
         else:
-            self.pc = self.v[0] + (self.operand & 0x0FFF)
-            self.last_op = f"JUMP V0 + {self.operand & 0x0FFF:03X}"
+            self.pc = self.v[0] + self.nnn
+            if self.trace:
+                self.last_op = f"JUMP V0 + {self.nnn:03X}"
 
     def generate_random_number(self):
         """
@@ -823,10 +1003,15 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     C         x        n         n
         """
-        value = self.operand & 0x00FF
-        x = (self.operand & 0x0F00) >> 8
-        self.v[x] = value & randint(0, 255)
-        self.last_op = f"RAND V{x:01X}, {value:02X}"
+        value = self.nn
+        x = self.x
+        if self.random_index >= RANDOM_BUFFER_SIZE:
+            self.random_bytes = urandom(RANDOM_BUFFER_SIZE)
+            self.random_index = 0
+        self.v[x] = value & self.random_bytes[self.random_index]
+        self.random_index += 1
+        if self.trace:
+            self.last_op = f"RAND V{x:01X}, {value:02X}"
 
     def draw_sprite(self):
         """
@@ -862,11 +1047,11 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                   unused    x_source  y_source  num_bytes
         """
-        x_source = (self.operand & 0x0F00) >> 8
-        y_source = (self.operand & 0x00F0) >> 4
+        x_source = self.x
+        y_source = self.y
         x_pos = self.v[x_source]
         y_pos = self.v[y_source]
-        num_bytes = self.operand & 0x000F
+        num_bytes = self.n
         self.v[0xF] = 0
 
         if num_bytes == 0:
@@ -875,14 +1060,16 @@ class Chip8CPU:
                 self.draw_extended(x_pos, y_pos, 2, index=self.index + 32)
             else:
                 self.draw_extended(x_pos, y_pos, self.bitplane)
-            self.last_op = f"DRAWEX V{x_source:01X}, V{y_source:01X}"
+            if self.trace:
+                self.last_op = f"DRAWEX V{x_source:01X}, V{y_source:01X}"
         else:
             if self.bitplane == 3:
                 self.draw_normal(x_pos, y_pos, num_bytes, 1, index=self.index)
                 self.draw_normal(x_pos, y_pos, num_bytes, 2, index=self.index + num_bytes)
             else:
                 self.draw_normal(x_pos, y_pos, num_bytes, self.bitplane)
-            self.last_op = f"DRAW V{x_source:01X}, V{y_source:01X}"
+            if self.trace:
+                self.last_op = f"DRAW V{x_source:01X}, V{y_source:01X}"
 
     def draw_normal(self, x_pos, y_pos, num_bytes, bitplane, index=None):
         """
@@ -897,22 +1084,11 @@ class Chip8CPU:
         if not index:
             index = self.index
 
-        for y_index in range(num_bytes):
-            color_byte = self.memory[index + y_index]
-            y_coord = y_pos + y_index
-            if not self.clip_quirks or (self.clip_quirks and y_coord < self.screen.get_height()):
-                y_coord = y_coord % self.screen.get_height()
-                mask = 0x80
-                for x_index in range(8):
-                    x_coord = x_pos + x_index
-                    if not self.clip_quirks or (self.clip_quirks and x_coord < self.screen.get_width()):
-                        x_coord = x_coord % self.screen.get_width()
-                        turned_on = (color_byte & mask) > 0
-                        current_on = self.screen.get_pixel(x_coord, y_coord, bitplane)
-                        self.v[0xF] |= 1 if turned_on and current_on else 0
-                        self.screen.draw_pixel(x_coord, y_coord, turned_on ^ current_on, bitplane)
-                        mask = mask >> 1
-        self.screen.update()
+        self.check_memory_range(index, index + num_bytes)
+        sprite = np.frombuffer(self.memory, dtype=np.uint8, count=num_bytes, offset=index)
+        sprite = np.unpackbits(sprite).reshape(num_bytes, 8)
+        if self.draw_bits(x_pos, y_pos, sprite, bitplane, clip_rows=self.clip_quirks):
+            self.v[0xF] = 1
 
     def draw_extended(self, x_pos, y_pos, bitplane, index=None):
         """
@@ -929,25 +1105,48 @@ class Chip8CPU:
         if not index:
             index = self.index
 
-        for y_index in range(16):
-            for x_byte in range(2):
-                color_byte = self.memory[index + (y_index * 2) + x_byte]
-                y_coord = y_pos + y_index
-                if y_coord < self.screen.get_height():
-                    y_coord = y_coord % self.screen.get_height()
-                    mask = 0x80
-                    for x_index in range(8):
-                        x_coord = x_pos + x_index + (x_byte * 8)
-                        if not self.clip_quirks or (self.clip_quirks and x_coord < self.screen.get_width()):
-                            x_coord = x_coord % self.screen.get_width()
-                            turned_on = (color_byte & mask) > 0
-                            current_on = self.screen.get_pixel(x_coord, y_coord, bitplane)
-                            self.v[0xF] += 1 if turned_on and current_on else 0
-                            self.screen.draw_pixel(x_coord, y_coord, turned_on ^ current_on, bitplane)
-                            mask = mask >> 1
-                else:
-                    self.v[0xF] += 1
-        self.screen.update()
+        screen = self.screen
+        height = screen.get_height()
+        self.check_memory_range(index, index + 32)
+        sprite = np.frombuffer(self.memory, dtype=np.uint8, count=32, offset=index)
+        sprite = np.unpackbits(sprite).reshape(16, 16)
+        collisions = self.v[0xF] + self.draw_bits(x_pos, y_pos, sprite, bitplane, clip_rows=True)
+        collisions += 2 * min(max(y_pos + 16 - height, 0), 16)
+        self.v[0xF] = collisions & 0xFF
+
+    def draw_bits(self, x_pos, y_pos, sprite, bitplane, clip_rows):
+        """
+        XORs all the rows of a sprite onto the screen at once. Only the
+        pixels that are set in the sprite can change the screen, so only the
+        coordinates of those pixels are passed to the screen, which XORs
+        them and checks them for collisions all at once. Pixels off the
+        right of the screen wrap around unless clip quirks are enabled, and
+        rows off the bottom of the screen wrap around unless clip_rows is set.
+
+        :param x_pos: the X position of the sprite
+        :param y_pos: the Y position of the sprite
+        :param sprite: an array of 0 or 1 values for each pixel in the sprite
+        :param bitplane: the bitplane to draw to
+        :param clip_rows: whether to clip rows off the bottom of the screen
+        :return: the number of pixels that were turned off
+        """
+        screen = self.screen
+        width = screen.get_width()
+        height = screen.get_height()
+        rows, columns = np.nonzero(sprite)
+        x_coords = columns + x_pos
+        y_coords = rows + y_pos
+        if self.clip_quirks:
+            visible = x_coords < width
+            x_coords = x_coords[visible]
+            y_coords = y_coords[visible]
+        if clip_rows:
+            visible = y_coords < height
+            x_coords = x_coords[visible]
+            y_coords = y_coords[visible]
+        if not x_coords.size:
+            return 0
+        return screen.xor_sprite(x_coords % width, y_coords % height, bitplane)
 
     def index_load_long(self):
         """
@@ -958,7 +1157,8 @@ class Chip8CPU:
         """
         self.index = (self.memory[self.pc] << 8) + self.memory[self.pc+1]
         self.pc += 2
-        self.last_op = f"LOADLONG {self.index:04X}"
+        if self.trace:
+            self.last_op = f"LOADLONG {self.index:04X}"
 
     def set_bitplane(self):
         """
@@ -977,8 +1177,9 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         n        0         1
         """
-        self.bitplane = (self.operand & 0x0F00) >> 8
-        self.last_op = f"BITPLANE {self.bitplane:01X}"
+        self.bitplane = self.x
+        if self.trace:
+            self.last_op = f"BITPLANE {self.bitplane:01X}"
 
     def load_audio_pattern_buffer(self):
         """
@@ -990,7 +1191,8 @@ class Chip8CPU:
         for x in range(16):
             self.audio_pattern_buffer[x] = self.memory[self.index + x]
         self.calculate_audio_waveform()
-        self.last_op = f"AUDIO {self.index:04X}"
+        if self.trace:
+            self.last_op = f"AUDIO {self.index:04X}"
 
     def move_delay_timer_into_reg(self):
         """
@@ -1002,9 +1204,10 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        0         7
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.v[x] = self.delay
-        self.last_op = f"LOAD V{x:01X}, DELAY"
+        if self.trace:
+            self.last_op = f"LOAD V{x:01X}, DELAY"
 
     def wait_for_keypress(self):
         """
@@ -1018,10 +1221,20 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        0         A
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.awaiting_keypress = True
         self.keypress_register = x
-        self.last_op = f"KEYD V{x:01X}"
+        if self.trace:
+            self.last_op = f"KEYD V{x:01X}"
+
+    def refresh_keys(self):
+        """
+        Reads and stores the current state of the keyboard. Pygame only
+        updates the keyboard state when events are pumped, so this should
+        be called after pygame.event.get() returns a key event, rather than
+        reading the keyboard on every keyboard routine.
+        """
+        self.keys_pressed = key.get_pressed()
 
     def decode_keypress_and_continue(self, keys_pressed):
         """
@@ -1031,10 +1244,24 @@ class Chip8CPU:
 
         :param keys_pressed: the list of keys pressed
         """
-        for keyval, lookup_key in KEY_MAPPINGS.items():
+        for keyval, lookup_key in enumerate(KEY_MAPPINGS_TABLE):
             if keys_pressed[lookup_key]:
                 self.v[self.keypress_register] = keyval
                 self.awaiting_keypress = False
+                return
+
+    def decode_single_keypress(self, keyboard_key):
+        """
+        Given a single keyboard key that was pressed, checks to see if it is
+        a chip8 key, and if it is, store it in the register specified by the
+        wait_for_keypress function. Will flag the CPU to continue executing.
+
+        :param keyboard_key: the pygame key that was pressed
+        """
+        chip8_key = CHIP8_KEYS.get(keyboard_key)
+        if chip8_key is not None:
+            self.v[self.keypress_register] = chip8_key
+            self.awaiting_keypress = False
 
     def move_reg_into_delay_timer(self):
         """
@@ -1046,9 +1273,10 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        1         5
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.delay = self.v[x]
-        self.last_op = f"LOAD DELAY, V{x:01X}"
+        if self.trace:
+            self.last_op = f"LOAD DELAY, V{x:01X}"
 
     def move_reg_into_sound_timer(self):
         """
@@ -1060,9 +1288,10 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        1         8
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.sound = self.v[x]
-        self.last_op = f"LOAD SOUND, V{x:01X}"
+        if self.trace:
+            self.last_op = f"LOAD SOUND, V{x:01X}"
 
     def load_index_with_reg_sprite(self):
         """
@@ -1076,9 +1305,10 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F        x         2         9
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.index = self.v[x] * 5
-        self.last_op = f"LOAD I, V{x:01X}"
+        if self.trace:
+            self.last_op = f"LOAD I, V{x:01X}"
 
     def load_index_with_extended_reg_sprite(self):
         """
@@ -1090,11 +1320,12 @@ class Chip8CPU:
         follows:
 
            Bits:  15-12     11-8      7-4       3-0
-                    F         x        2         9
+                    F         x        3         0
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.index = self.v[x] * 10
-        self.last_op = f"LOADEXT I, V{x:01X}"
+        if self.trace:
+            self.last_op = f"LOADEXT I, V{x:01X}"
 
     def add_reg_into_index(self):
         """
@@ -1106,9 +1337,10 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        1         E
         """
-        x = (self.operand & 0x0F00) >> 8
-        self.index += self.v[x]
-        self.last_op = f"ADD I, V{x:01X}"
+        x = self.x
+        self.index = (self.index + self.v[x]) & 0xFFFF
+        if self.trace:
+            self.last_op = f"ADD I, V{x:01X}"
 
     def store_bcd_in_memory(self):
         """
@@ -1133,12 +1365,14 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        3         3
         """
-        x = (self.operand & 0x0F00) >> 8
-        bcd_value = f"{self.v[x]:03d}"
-        self.memory[self.index] = int(bcd_value[0])
-        self.memory[self.index + 1] = int(bcd_value[1])
-        self.memory[self.index + 2] = int(bcd_value[2])
-        self.last_op = f"BCD V{x:01X} ({bcd_value})"
+        x = self.x
+        value = self.v[x]
+        index = self.index
+        self.check_memory_range(index, index + 3)
+        self.memory[index:index + 3] = BCD_TABLE[value]
+        self.invalidate_decode_cache(index, index + 3)
+        if self.trace:
+            self.last_op = f"BCD V{x:01X} ({value:03d})"
 
     def load_pitch(self):
         """
@@ -1150,10 +1384,11 @@ class Chip8CPU:
            Bits:  15-12     11-8      7-4       3-0
                     F         x        3         A
         """
-        x = (self.operand & 0x0F00) >> 8
+        x = self.x
         self.pitch = self.v[x]
         self.playback_rate = 4000 * 2 ** ((self.pitch - 64) / 48)
-        self.last_op = f"PITCH V{x:01X}"
+        if self.trace:
+            self.last_op = f"PITCH V{x:01X}"
 
     def store_regs_in_memory(self):
         """
@@ -1168,12 +1403,16 @@ class Chip8CPU:
         For example, to store all V registers, num_regs would contain
         the value 'F'.
         """
-        num_regs = (self.operand & 0x0F00) >> 8
-        for counter in range(num_regs + 1):
-            self.memory[self.index + counter] = self.v[counter]
+        num_regs = self.x
+        count = num_regs + 1
+        index = self.index
+        self.check_memory_range(index, index + count)
+        self.memory[index:index + count] = self.v[:count]
+        self.invalidate_decode_cache(index, index + count)
         if not self.index_quirks:
-            self.index += num_regs + 1
-        self.last_op = f"STOR {num_regs:01X}"
+            self.index = (index + count) & 0xFFFF
+        if self.trace:
+            self.last_op = f"STOR {num_regs:01X}"
 
     def read_regs_from_memory(self):
         """
@@ -1189,12 +1428,15 @@ class Chip8CPU:
         For example, to load all the V registers, num_regs would
         contain the value 'F'.
         """
-        num_regs = (self.operand & 0x0F00) >> 8
-        for counter in range(num_regs + 1):
-            self.v[counter] = self.memory[self.index + counter]
+        num_regs = self.x
+        count = num_regs + 1
+        index = self.index
+        self.check_memory_range(index, index + count)
+        self.v[:count] = self.memory[index:index + count]
         if not self.index_quirks:
-            self.index += num_regs + 1
-        self.last_op = f"READ {num_regs}"
+            self.index = (index + count) & 0xFFFF
+        if self.trace:
+            self.last_op = f"READ {num_regs}"
 
     def store_regs_in_rpl(self):
         """
@@ -1208,10 +1450,10 @@ class Chip8CPU:
         For example, to store all the V registers, num_regs would contain
         the value 'F'.
         """
-        num_regs = (self.operand & 0x0F00) >> 8
-        for counter in range(num_regs + 1):
-            self.rpl[counter] = self.v[counter]
-        self.last_op = f"STORRPL {num_regs:01X}"
+        num_regs = self.x
+        self.rpl[:num_regs + 1] = self.v[:num_regs + 1]
+        if self.trace:
+            self.last_op = f"STORRPL {num_regs:01X}"
 
     def read_regs_from_rpl(self):
         """
@@ -1225,10 +1467,10 @@ class Chip8CPU:
         For example, to load all the V registers, num_regs would
         contain the value 'F'.
         """
-        num_regs = (self.operand & 0x0F00) >> 8
-        for counter in range(num_regs + 1):
-            self.v[counter] = self.rpl[counter]
-        self.last_op = f"READRPL {num_regs:01X}"
+        num_regs = self.x
+        self.v[:num_regs + 1] = self.rpl[:num_regs + 1]
+        if self.trace:
+            self.last_op = f"READRPL {num_regs:01X}"
 
     def reset(self):
         """
@@ -1238,11 +1480,11 @@ class Chip8CPU:
         self.last_op = "None"
         self.sound = 0
         self.delay = 0
-        self.v = [0] * NUM_REGISTERS
+        self.v = bytearray(NUM_REGISTERS)
         self.pc = PROGRAM_COUNTER_START
         self.sp = STACK_POINTER_START
         self.index = 0
-        self.rpl = [0] * NUM_REGISTERS
+        self.rpl = bytearray(NUM_REGISTERS)
         self.pitch = 64
         self.playback_rate = 4000
         self.audio_pattern_buffer = [0] * 16
@@ -1262,21 +1504,24 @@ class Chip8CPU:
         """
         with open(filename, 'rb') as rom_file:
             rom_data = rom_file.read()
-            for index, val in enumerate(rom_data):
-                self.memory[offset + index] = val
+        self.check_memory_range(offset, offset + len(rom_data))
+        self.memory[offset:offset + len(rom_data)] = rom_data
+        self.invalidate_decode_cache(offset, offset + len(rom_data))
 
     def decrement_timers(self):
         """
         Decrement both the sound and delay timer.
         """
-        self.delay -= 1 if self.delay > 0 else 0
-        self.sound -= 1 if self.delay > 0 else 0
-        if self.sound > 0 and not self.sound_playing:
+        delay = self.delay
+        self.delay = delay - 1 if delay else 0
+        sound = self.sound
+        self.sound = sound = sound - 1 if sound else 0
+        if sound > 0 and not self.sound_playing:
             if self.sound_waveform:
                 self.sound_waveform.play(loops=-1)
             self.sound_playing = True
 
-        if self.sound == 0 and self.sound_playing:
+        if sound == 0 and self.sound_playing:
             if self.sound_waveform:
                 self.sound_waveform.stop()
             self.sound_playing = False
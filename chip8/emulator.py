@@ -8,7 +8,9 @@ A simple Chip 8 emulator - see the README file for more information.
 
 import pygame
 
-from chip8.config import FONT_FILE
+from time import monotonic_ns
+
+from chip8.config import FONT_FILE, EVENT_POLL_INTERVAL
 from chip8.cpu import Chip8CPU
 from chip8.screen import Chip8Screen
 
@@ -39,6 +41,7 @@ def main_loop(args):
         clip_quirks=args.clip_quirks,
         logic_quirks=args.logic_quirks,
         mem_size=args.mem_size,
+        trace=args.trace,
     )
     cpu.load_rom(FONT_FILE, 0)
     cpu.load_rom(args.rom)
@@ -46,26 +49,72 @@ def main_loop(args):
     pygame.init()
     pygame.time.set_timer(delay_timer_event, 17)
 
+    # Look up the functions and constants used on every pass through the
+    # loop once, rather than on every instruction
+    wait = pygame.time.wait
+    event_get = pygame.event.get
+    escape_key = pygame.K_ESCAPE
+    execute_instruction = cpu.execute_instruction
+    refresh_keys = cpu.refresh_keys
+    update_screen = screen.update
+    op_delay = args.op_delay * 1_000_000
+    trace = args.trace
+
+    # The timer tick doubles as the frame clock: drawing only changes the
+    # pixel buffer, and the display is presented once per 60Hz tick
+    def handle_timer(event):
+        cpu.decrement_timers()
+        update_screen()
+
+    def handle_quit(event):
+        cpu.running = False
+
+    def handle_keyup(event):
+        refresh_keys()
+
+    def handle_keydown(event):
+        refresh_keys()
+        if event.key == escape_key:
+            cpu.running = False
+        elif cpu.awaiting_keypress:
+            cpu.decode_single_keypress(event.key)
+
+    # Events are dispatched by their type, and all other events are ignored
+    event_handlers = {
+        delay_timer_event: handle_timer,
+        pygame.QUIT: handle_quit,
+        pygame.KEYDOWN: handle_keydown,
+        pygame.KEYUP: handle_keyup,
+    }
+
+    # Instructions are run in batches against a monotonic clock. Each batch
+    # runs every instruction that is due (or, with no delay, as many as fit
+    # into the poll interval), and events are processed once per batch
+    refresh_keys()
+    next_op = monotonic_ns()
     while cpu.running:
-        pygame.time.wait(args.op_delay)
-
-        if not cpu.awaiting_keypress:
-            cpu.execute_instruction()
-
-        if args.trace:
-            print(cpu)
-
-        # # Check for events of specific types
-        for event in pygame.event.get():
-            if event.type == delay_timer_event:
-                cpu.decrement_timers()
-            if event.type == pygame.QUIT:
-                cpu.running = False
-            if event.type == pygame.KEYDOWN:
-                keys_pressed = pygame.key.get_pressed()
-                if keys_pressed[pygame.K_ESCAPE]:
-                    cpu.running = False
-                if cpu.awaiting_keypress:
-                    cpu.decode_keypress_and_continue(keys_pressed)
+        now = monotonic_ns()
+        batch_end = now + EVENT_POLL_INTERVAL
+        if next_op < now - EVENT_POLL_INTERVAL:
+            next_op = now - EVENT_POLL_INTERVAL
+
+        while next_op <= now < batch_end and cpu.running:
+            if not cpu.awaiting_keypress:
+                execute_instruction()
+            if trace:
+                print(cpu)
+            next_op += op_delay
+            now = monotonic_ns()
+
+        # # Check for events of specific types. The keyboard state is only
+        # read again when a key is pressed or released
+        for event in event_get():
+            handler = event_handlers.get(event.type)
+            if handler is not None:
+                handler(event)
+
+        now = monotonic_ns()
+        if next_op > now:
+            wait((next_op - now) // 1_000_000)
 
 # E N D   O F   F I L E #######################################################
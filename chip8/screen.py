@@ -6,7 +6,14 @@ A Chip 8 Screen - see the README file for more information.
 """
 # I M P O R T S ###############################################################
 
-from pygame import display, HWSURFACE, DOUBLEBUF, Color, draw
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+from pygame import display, surfarray, transform, DOUBLEBUF, Color, Surface
 
 # C O N S T A N T S ###########################################################
 
@@ -15,8 +22,51 @@ SCREEN_MODE_NORMAL = 0
 SCREEN_MODE_EXTENDED = 1
 
 # The depth of the screen is the number of bits used to represent the color
-# of a pixel.
-SCREEN_DEPTH = 8
+# of a pixel. This matches the format of the surfaces that frames are rendered
+# to, so that blitting a frame to the display needs no format conversion.
+SCREEN_DEPTH = 32
+
+# F U N C T I O N S  ##########################################################
+
+
+def xor_pixels(pixels, x_coords, y_coords, bitplane):
+    """
+    XORs the bitplane into the pixels at the specified coordinates of the
+    pixel buffer. The coordinates must not repeat.
+
+    :param pixels: the pixel buffer to change
+    :param x_coords: an array of the x coordinates of the pixels to XOR
+    :param y_coords: an array of the y coordinates of the pixels to XOR
+    :param bitplane: the bitplane where the pixels are located
+    :return: the number of pixels that were turned off
+    """
+    current = pixels[y_coords, x_coords]
+    pixels[y_coords, x_coords] = current ^ bitplane
+    return int(np.count_nonzero(current & bitplane))
+
+
+if njit is not None:
+    @njit(cache=True)
+    def xor_pixels(pixels, x_coords, y_coords, bitplane):
+        """
+        Compiled version of xor_pixels, used when numba is installed. Sprites
+        are at most 16 x 16 pixels, so a native loop avoids the per-call
+        overhead of the NumPy operations above.
+
+        :param pixels: the pixel buffer to change
+        :param x_coords: an array of the x coordinates of the pixels to XOR
+        :param y_coords: an array of the y coordinates of the pixels to XOR
+        :param bitplane: the bitplane where the pixels are located
+        :return: the number of pixels that were turned off
+        """
+        collisions = 0
+        for index in range(len(x_coords)):
+            x_coord = x_coords[index]
+            y_coord = y_coords[index]
+            if pixels[y_coord, x_coord] & bitplane:
+                collisions += 1
+            pixels[y_coord, x_coord] ^= bitplane
+        return collisions
 
 # C L A S S E S ###############################################################
 
@@ -27,6 +77,12 @@ class Chip8Screen:
     with 2 colors. In this emulator, this translates to color 0 (off) and color
     1 (on).
     """
+    __slots__ = (
+        "height", "width", "scale_factor", "surface", "mode", "pixels",
+        "mode_width", "mode_height", "visible_pixels", "pixel_colors",
+        "dirty", "palette", "frames", "scaled_frame",
+    )
+
     def __init__(
             self,
             scale_factor,
@@ -47,24 +103,57 @@ class Chip8Screen:
         self.scale_factor = scale_factor
         self.surface = None
         self.mode = SCREEN_MODE_NORMAL
-        self.pixel_colors = {
-            0: Color(f"#{color_0}"),
-            1: Color(f"#{color_1}"),
-            2: Color(f"#{color_2}"),
-            3: Color(f"#{color_3}"),
+
+        # The pixel buffer holds the color of every pixel on the screen. Bit
+        # 0 of each entry is the state of the pixel on bitplane 1, and bit 1
+        # is the state of the pixel on bitplane 2, so each entry is also the
+        # index of the color in pixel_colors that the pixel is drawn with
+        self.pixels = np.zeros((self.height, self.width), dtype=np.uint8)
+
+        # The size of the screen in the current mode, and a view of the part
+        # of the pixel buffer that is visible in it. These only change when
+        # the mode changes
+        self.mode_width = 64
+        self.mode_height = 32
+        self.visible_pixels = self.pixels[:32, :64]
+        self.pixel_colors = (
+            Color(f"#{color_0}"),
+            Color(f"#{color_1}"),
+            Color(f"#{color_2}"),
+            Color(f"#{color_3}"),
+        )
+
+        # Whether the pixel buffer or mode has changed since the display was
+        # last updated. Updates are skipped while the screen is unchanged
+        self.dirty = True
+
+        # The palette maps the entries in the pixel buffer to RGB values, so
+        # that the visible part of the pixel buffer can be converted to an
+        # image in one step. Frames are rendered at the Chip 8 resolution of
+        # the current mode, and then scaled up to the size of the display
+        self.palette = np.array(
+            [tuple(color)[:3] for color in self.pixel_colors],
+            dtype=np.uint8
+        )
+        self.frames = {
+            SCREEN_MODE_NORMAL: Surface((64, 32)),
+            SCREEN_MODE_EXTENDED: Surface((128, 64)),
         }
+        self.scaled_frame = Surface((self.width * scale_factor, self.height * scale_factor))
 
     def init_display(self):
         """
         Attempts to initialize a screen with the specified height and width.
         The screen will by default be of depth SCREEN_DEPTH, and will be
-        double-buffered in hardware (if possible).
+        double-buffered (if possible). HWSURFACE is not requested, since it
+        has no effect in SDL2 - hardware acceleration there is controlled by
+        the SDL_WINDOW_* and renderer flags that pygame sets up itself.
         """
         display.init()
         self.surface = display.set_mode(
             ((self.width * self.scale_factor),
              (self.height * self.scale_factor)),
-            HWSURFACE | DOUBLEBUF,
+            DOUBLEBUF,
             SCREEN_DEPTH)
         display.set_caption('CHIP8 Emulator')
         self.clear_screen(3)
@@ -74,7 +163,7 @@ class Chip8Screen:
         """
         Turn a pixel on or off at the specified location on the screen. Note
         that the pixel will not automatically be drawn on the screen, you
-        must call the update() function to flip the drawing buffer to the
+        must call the update() function to draw the pixel buffer to the
         display. The coordinate system starts with (0, 0) being in the top
         left of the screen.
 
@@ -86,25 +175,25 @@ class Chip8Screen:
         if bitplane == 0:
             return
 
-        other_bitplane = 2 if bitplane == 1 else 1
-        other_pixel_on = self.get_pixel(x_pos, y_pos, other_bitplane)
-
-        mode_scale = 1 if self.mode == SCREEN_MODE_EXTENDED else 2
-        x_base = (x_pos * mode_scale) * self.scale_factor
-        y_base = (y_pos * mode_scale) * self.scale_factor
-
-        if turn_on and other_pixel_on:
-            pixel_color = 3
-        elif turn_on and not other_pixel_on:
-            pixel_color = bitplane
-        elif not turn_on and other_pixel_on:
-            pixel_color = other_bitplane
+        if turn_on:
+            self.pixels[y_pos, x_pos] |= bitplane
         else:
-            pixel_color = 0
+            self.pixels[y_pos, x_pos] &= ~bitplane & 0xFF
+        self.dirty = True
 
-        draw.rect(self.surface,
-                  self.pixel_colors[pixel_color],
-                  (x_base, y_base, mode_scale * self.scale_factor, mode_scale * self.scale_factor))
+    def xor_sprite(self, x_coords, y_coords, bitplane):
+        """
+        XORs a set of pixels on the specified bitplane, as is done when
+        drawing the set pixels of a sprite. Like draw_pixel, the pixels will
+        not be drawn on the screen until update() is called.
+
+        :param x_coords: an array of the x coordinates of the pixels to XOR
+        :param y_coords: an array of the y coordinates of the pixels to XOR
+        :param bitplane: the bitplane where the pixels are located
+        :return: the number of pixels that were turned off
+        """
+        self.dirty = True
+        return xor_pixels(self.pixels, x_coords, y_coords, bitplane)
 
     def get_pixel(self, x_pos, y_pos, bitplane):
         """
@@ -119,11 +208,7 @@ class Chip8Screen:
         if bitplane == 0:
             return False
 
-        mode_scale = 1 if self.mode == SCREEN_MODE_EXTENDED else 2
-        x_scale = (x_pos * mode_scale) * self.scale_factor
-        y_scale = (y_pos * mode_scale) * self.scale_factor
-        pixel_color = self.surface.get_at((x_scale, y_scale))
-        return pixel_color == self.pixel_colors[bitplane] or pixel_color == self.pixel_colors[3]
+        return (self.pixels.item(y_pos, x_pos) & bitplane) == bitplane
 
     def get_width(self):
         """
@@ -131,7 +216,7 @@ class Chip8Screen:
 
         :return: the width of the screen
         """
-        return 128 if self.mode == SCREEN_MODE_EXTENDED else 64
+        return self.mode_width
 
     def get_height(self):
         """
@@ -139,7 +224,7 @@ class Chip8Screen:
 
         :return: the height of the screen
         """
-        return 64 if self.mode == SCREEN_MODE_EXTENDED else 32
+        return self.mode_height
 
     def clear_screen(self, bitplane):
         """
@@ -150,37 +235,57 @@ class Chip8Screen:
         if bitplane == 0:
             return
 
+        self.dirty = True
         if bitplane == 3:
-            self.surface.fill(self.pixel_colors[0])
+            self.pixels.fill(0)
             return
 
-        max_x = self.get_width()
-        max_y = self.get_height()
-        for x in range(max_x):
-            for y in range(max_y):
-                self.draw_pixel(x, y, False, bitplane)
+        self.visible_pixels &= ~bitplane & 0xFF
 
-    @staticmethod
-    def update():
+    def update(self):
         """
-        Updates the display by swapping the back buffer and screen buffer.
-        According to the pygame documentation, the flip should wait for a
-        vertical retrace when both HWSURFACE and DOUBLEBUF are set on the
-        surface.
+        Updates the display by drawing the visible part of the pixel buffer
+        to the back buffer, and then swapping the back buffer and screen
+        buffer. Nothing is done if the screen has not changed since the
+        last update. Drawing, clearing and scrolling only change the pixel
+        buffer, so this is called once per frame to present the result.
         """
+        if not self.dirty:
+            return
+        self.dirty = False
+        frame = self.frames[self.mode]
+        surfarray.blit_array(frame, self.palette[self.visible_pixels].transpose(1, 0, 2))
+        transform.scale(frame, self.scaled_frame.get_size(), self.scaled_frame)
+        self.surface.blit(self.scaled_frame, (0, 0))
         display.flip()
 
     def set_extended(self):
         """
-        Sets the screen mode to extended.
+        Sets the screen mode to extended. Pixels in normal mode are twice
+        the size of pixels in extended mode, so the pixel buffer is
+        rescaled to match what is currently on the display.
         """
+        if self.mode != SCREEN_MODE_EXTENDED:
+            self.pixels[:, :] = self.pixels[:32, :64].repeat(2, axis=0).repeat(2, axis=1)
+            self.dirty = True
         self.mode = SCREEN_MODE_EXTENDED
+        self.mode_width = 128
+        self.mode_height = 64
+        self.visible_pixels = self.pixels
 
     def set_normal(self):
         """
-        Sets the screen mode to normal.
+        Sets the screen mode to normal. Pixels in normal mode are twice the
+        size of pixels in extended mode, so the pixel buffer is rescaled to
+        match what is currently on the display.
         """
+        if self.mode != SCREEN_MODE_NORMAL:
+            self.pixels[:32, :64] = self.pixels[::2, ::2]
+            self.dirty = True
         self.mode = SCREEN_MODE_NORMAL
+        self.mode_width = 64
+        self.mode_height = 32
+        self.visible_pixels = self.pixels[:32, :64]
 
     def scroll_down(self, num_lines, bitplane):
         """
@@ -192,33 +297,12 @@ class Chip8Screen:
         if bitplane == 0:
             return
 
-        mode_scale = 1 if self.mode == SCREEN_MODE_EXTENDED else 2
-        actual_lines = num_lines * mode_scale * self.scale_factor
-        if bitplane == 3:
-            self.surface.scroll(0, actual_lines)
-            self.surface.fill(self.pixel_colors[0], (0, 0, self.width * mode_scale * self.scale_factor, actual_lines))
-            self.update()
-            return
-
-        max_x = self.get_width()
-        max_y = self.get_height()
-
-        # Blank out any pixels in the bottom n lines that we will copy to
-        for x in range(max_x):
-            for y in range(max_y - num_lines, max_y):
-                self.draw_pixel(x, y, False, bitplane)
-
-        # Start copying pixels from the top to the bottom and shift by n pixels
-        for x in range(max_x):
-            for y in range(max_y - num_lines - 1, -1, -1):
-                current_pixel = self.get_pixel(x, y, bitplane)
-                self.draw_pixel(x, y, False, bitplane)
-                self.draw_pixel(x, y + num_lines, current_pixel, bitplane)
-
-        # Blank out any pixels in the first num_lines horizontal lines
-        for x in range(max_x):
-            for y in range(num_lines):
-                self.draw_pixel(x, y, False, bitplane)
+        max_y = self.mode_height
+        pixels = self.visible_pixels
+        plane = pixels & bitplane
+        pixels &= ~bitplane & 0xFF
+        self.dirty = True
+        pixels[num_lines:] |= plane[:max_y - num_lines]
 
     def scroll_up(self, num_lines, bitplane):
         """
@@ -230,41 +314,12 @@ class Chip8Screen:
         if bitplane == 0:
             return
 
-        mode_scale = 1 if self.mode == SCREEN_MODE_EXTENDED else 2
-        actual_lines = num_lines * mode_scale * self.scale_factor
-        if bitplane == 3:
-            self.surface.scroll(0, -actual_lines)
-            self.surface.fill(
-                self.pixel_colors[0],
-                (
-                    0,
-                    self.height * mode_scale * self.scale_factor - actual_lines,
-                    self.width * mode_scale * self.scale_factor,
-                    self.height * mode_scale * self.scale_factor
-                )
-            )
-            self.update()
-            return
-
-        max_x = self.get_width()
-        max_y = self.get_height()
-
-        # Blank out any pixels in the top n lines that we will copy to
-        for x in range(max_x):
-            for y in range(num_lines):
-                self.draw_pixel(x, y, False, bitplane)
-
-        # Start copying pixels from the top to the bottom and shift up by n pixels
-        for x in range(max_x):
-            for y in range(num_lines, max_y):
-                current_pixel = self.get_pixel(x, y, bitplane)
-                self.draw_pixel(x, y, False, bitplane)
-                self.draw_pixel(x, y - num_lines, current_pixel, bitplane)
-
-        # Blank out any pixels in the bottom num_lines horizontal lines
-        for x in range(max_x):
-            for y in range(max_y - num_lines, max_y):
-                self.draw_pixel(x, y, False, bitplane)
+        max_y = self.mode_height
+        pixels = self.visible_pixels
+        plane = pixels & bitplane
+        pixels &= ~bitplane & 0xFF
+        self.dirty = True
+        pixels[:max_y - num_lines] |= plane[num_lines:]
 
     def scroll_left(self, bitplane):
         """
@@ -274,50 +329,13 @@ class Chip8Screen:
         """
         if bitplane == 0:
             return
-        
-        other_bitplane = 1 if bitplane == 2 else 2
-        max_x = self.get_width()
-        max_y = self.get_height()
 
-        if bitplane == 3:
-            # Blank out any pixels in the left 4 vertical lines that we will copy to
-            for x in range(4):
-                for y in range(max_y):
-                    self.draw_pixel(x, y, False, 1)
-                    self.draw_pixel(x, y, False, 2)
-
-            # Start copying pixels from the right to the left and shift by 4 pixels
-            for x in range(4, max_x):
-                for y in range(max_y):
-                    current_pixel = self.get_pixel(x, y, 1)
-                    self.draw_pixel(x, y, False, 1)
-                    self.draw_pixel(x - 4, y, current_pixel, 1)
-                    current_pixel = self.get_pixel(x, y, 2)
-                    self.draw_pixel(x, y, False, 2)
-                    self.draw_pixel(x - 4, y, current_pixel, 2)
-
-            # Blank out any pixels in the right 4 vertical lines
-            for x in range(max_x - 4, max_x):
-                for y in range(max_y):
-                    self.draw_pixel(x, y, False, 1)
-                    self.draw_pixel(x, y, False, 2)
-        else:
-            for x in range(4):
-                for y in range(max_y):
-                    self.draw_pixel(x, y, False, bitplane)
-
-            # Start copying pixels from the right to the left and shift by 4 pixels
-            for x in range(4, max_x):
-                for y in range(max_y):
-                    current_pixel = self.get_pixel(x, y, bitplane)
-                    self.draw_pixel(x, y, False, bitplane)
-                    self.draw_pixel(x - 4, y, current_pixel, bitplane)
-
-            # Blank out any pixels in the right 4 vertical lines
-            for x in range(max_x - 4, max_x):
-                for y in range(max_y):
-                    self.draw_pixel(x, y, False, bitplane)
-        self.update()
+        max_x = self.mode_width
+        pixels = self.visible_pixels
+        plane = pixels & bitplane
+        pixels &= ~bitplane & 0xFF
+        self.dirty = True
+        pixels[:, :max_x - 4] |= plane[:, 4:]
 
     def scroll_right(self, bitplane):
         """
@@ -328,33 +346,11 @@ class Chip8Screen:
         if bitplane == 0:
             return
 
-        mode_scale = 1 if self.mode == SCREEN_MODE_EXTENDED else 2
-        actual_lines = 4 * mode_scale * self.scale_factor
-
-        if bitplane == 3:
-            self.surface.scroll(actual_lines, 0)
-            self.surface.fill(self.pixel_colors[0], (0, 0, actual_lines, self.height * mode_scale * self.scale_factor))
-            self.update()
-            return
-
-        max_x = self.get_width()
-        max_y = self.get_height()
-
-        # Blank out any pixels in the right vertical lines that we will copy to
-        for x in range(max_x - 4, max_x):
-            for y in range(max_y):
-                self.draw_pixel(x, y, False, bitplane)
-
-        # Start copying pixels from the left to the right and shift by 4 pixels
-        for x in range(max_x - 4 - 1, -1, -1):
-            for y in range(max_y):
-                current_pixel = self.get_pixel(x, y, bitplane)
-                self.draw_pixel(x, y, False, bitplane)
-                self.draw_pixel(x + 4, y, current_pixel, bitplane)
-
-        # Blank out any pixels in the left 4 vertical lines
-        for x in range(4):
-            for y in range(max_y):
-                self.draw_pixel(x, y, False, bitplane)
+        max_x = self.mode_width
+        pixels = self.visible_pixels
+        plane = pixels & bitplane
+        pixels &= ~bitplane & 0xFF
+        self.dirty = True
+        pixels[:, 4:] |= plane[:, :max_x - 4]
 
 # E N D   O F   F I L E ########################################################
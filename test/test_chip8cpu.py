@@ -6,18 +6,28 @@ A simple Chip 8 emulator - see the README file for more information.
 """
 # I M P O R T S ###############################################################
 
-import mock
+import numpy as np
+import os
 import pygame
+import tempfile
 import unittest
 
-from mock import patch, call
+from unittest import mock
 
+from chip8.config import KEY_MAPPINGS
 from chip8.cpu import Chip8CPU, UnknownOpCodeException, MODE_EXTENDED
 from chip8.screen import Chip8Screen
 
 # C O N S T A N T S ###########################################################
 
-KEYPRESS_TABLE = [0] * 512
+# Keyboard states returned by the patched pygame.key.get_pressed - no keys
+# pressed, and only the key mapped to Chip 8 key 1 pressed
+KEYPRESS_TABLE = (False,) * 512
+KEY_1_PRESSED_TABLE = tuple(key == pygame.K_1 for key in range(512))
+
+# Byte values used by the register arithmetic tests - the boundaries where
+# carries, borrows and sign bits change, plus a spread of values in between
+BYTE_SAMPLES = (0x00, 0x01, 0x0F, 0x10, 0x3C, 0x55, 0x7F, 0x80, 0xAA, 0xC7, 0xFE, 0xFF)
 
 # C L A S S E S ###############################################################
 
@@ -26,6 +36,28 @@ class TestChip8CPU(unittest.TestCase):
     """
     A test class for the Chip 8 CPU.
     """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Initializes the display once for the whole test case. The drawing
+        integration tests share the resulting screen, since initializing
+        the display is the most expensive part of their setup. The keyboard
+        state is patched once for the whole test case too, and individual
+        tests set the keys they need pressed on key_mock.
+        """
+        cls.display_screen = Chip8Screen(2)
+        cls.display_screen.init_display()
+        key_patcher = mock.patch("pygame.key.get_pressed", return_value=KEYPRESS_TABLE)
+        cls.key_mock = key_patcher.start()
+        cls.addClassCleanup(key_patcher.stop)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Shuts down the display shared by the drawing integration tests.
+        """
+        pygame.display.quit()
+
     def setUp(self):
         """
         Common setup routines needed for all unit tests.
@@ -33,6 +65,55 @@ class TestChip8CPU(unittest.TestCase):
         self.screen = mock.MagicMock()
         self.cpu = Chip8CPU(self.screen)
         self.cpu_spy = mock.Mock(wraps=self.cpu)
+        self.key_mock.reset_mock()
+        self.key_mock.return_value = KEYPRESS_TABLE
+
+    def get_display_screen(self):
+        """
+        Returns the screen shared by the drawing integration tests, reset
+        to a blank screen in normal mode.
+
+        :return: the shared screen
+        """
+        self.display_screen.set_normal()
+        self.display_screen.clear_screen(3)
+        return self.display_screen
+
+    def check_register_operation(self, operation, source, target,
+                                 source_values, target_values,
+                                 expected, expected_flags=None):
+        """
+        Runs a register to register operation once for every combination
+        of source and target register values, and checks the resulting
+        source register (and optionally flag register) values. Each
+        register pair is checked in its own subTest, so a failure reports
+        the registers involved and the remaining pairs are still checked.
+
+        :param operation: the CPU operation to run
+        :param source: the source (x) register number
+        :param target: the target (y) register number
+        :param source_values: the values to load into the source register
+        :param target_values: the values to load into the target register
+        :param expected: the expected source register values, indexed by
+            [source value, target value]
+        :param expected_flags: the expected flag register values, indexed
+            by [source value, target value]
+        """
+        results = np.zeros((len(source_values), len(target_values)), dtype=np.uint8)
+        flags = np.zeros_like(results)
+        self.cpu.operand = (source << 8) | (target << 4)
+        v = self.cpu.v
+        for i, source_val in enumerate(source_values):
+            for j, target_val in enumerate(target_values):
+                v[source] = source_val
+                v[target] = target_val
+                operation()
+                results[i, j] = v[source]
+                flags[i, j] = v[0xF]
+        with self.subTest(source=source, target=target):
+            np.testing.assert_array_equal(expected, results)
+            if expected_flags is not None:
+                np.testing.assert_array_equal(expected_flags, flags)
 
     def test_clear_return_with_unknown_opcode(self):
         with self.assertRaises(UnknownOpCodeException) as context:
@@ -76,48 +157,60 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(8000, self.cpu.playback_rate)
 
     def test_return_from_subroutine(self):
+        cpu = self.cpu
+        memory = cpu.memory
         for address in range(0x200, 0xFFFF, 0x10):
-            self.cpu.memory[self.cpu.sp] = address & 0x00FF
-            self.cpu.memory[self.cpu.sp + 1] = \
-                (address & 0xFF00) >> 8
-            self.cpu.sp += 2
-            self.cpu.pc = 0
-            self.cpu.return_from_subroutine()
-            self.assertEqual(self.cpu.pc, address)
+            sp = cpu.sp
+            memory[sp:sp + 2] = address.to_bytes(2, "little")
+            cpu.sp = sp + 2
+            cpu.pc = 0
+            cpu.return_from_subroutine()
+            self.assertEqual(cpu.pc, address)
 
     def test_jump_to_address(self):
+        cpu = self.cpu
+        jump_to_address = cpu.jump_to_address
         for address in range(0, 0xFFFF, 0x10):
-            self.cpu.operand = address
-            self.cpu.pc = 0
-            self.assertEqual(self.cpu.pc, 0)
-            self.cpu.jump_to_address()
-            self.assertEqual(self.cpu.pc, (address & 0x0FFF))
+            cpu.operand = address
+            cpu.pc = 0
+            jump_to_address()
+            self.assertEqual(cpu.pc, (address & 0x0FFF))
 
     def test_jump_to_subroutine(self):
+        cpu = self.cpu
+        jump_to_subroutine = cpu.jump_to_subroutine
         for address in range(0x200, 0xFFFF, 0x10):
-            self.cpu.operand = address
-            self.cpu.sp = 0
-            self.cpu.pc = 0x100
-            self.cpu.jump_to_subroutine()
-            self.assertEqual(self.cpu.pc, (address & 0x0FFF))
-            self.assertEqual(self.cpu.sp, 2)
-            self.assertEqual(self.cpu.memory[0], 0)
-            self.assertEqual(self.cpu.memory[1], 0x1)
+            cpu.operand = address
+            cpu.sp = 0
+            cpu.pc = 0x100
+            jump_to_subroutine()
+            self.assertEqual(cpu.pc, (address & 0x0FFF))
+            self.assertEqual(cpu.sp, 2)
+            self.assertEqual(b"\x00\x01", cpu.memory[0:2])
+
+    def test_jump_to_subroutine_and_return(self):
+        self.cpu.pc = 0x0ABC
+        self.cpu.operand = 0x2400
+        self.cpu.jump_to_subroutine()
+        self.assertEqual(0x400, self.cpu.pc)
+        self.assertEqual(0xBC, self.cpu.memory[0x52])
+        self.assertEqual(0x0A, self.cpu.memory[0x53])
+        self.cpu.return_from_subroutine()
+        self.assertEqual(0x0ABC, self.cpu.pc)
+        self.assertEqual(0x52, self.cpu.sp)
 
     def test_skip_if_reg_equal_value(self):
+        cpu = self.cpu
+        v = cpu.v
+        skip_if_reg_equal_val = cpu.skip_if_reg_equal_val
         for register in range(0x10):
             for value in range(0, 0xFF, 0x10):
+                cpu.operand = (register << 8) | value
                 for reg_value in range(0, 0xFF, 0x10):
-                    self.cpu.operand = register << 8
-                    self.cpu.operand += value
-                    self.cpu.v[register] = reg_value
-                    self.cpu.pc = 0
-                    self.assertEqual(self.cpu.pc, 0)
-                    self.cpu.skip_if_reg_equal_val()
-                    if value == reg_value:
-                        self.assertEqual(self.cpu.pc, 2)
-                    else:
-                        self.assertEqual(self.cpu.pc, 0)
+                    v[register] = reg_value
+                    cpu.pc = 0
+                    skip_if_reg_equal_val()
+                    self.assertEqual(cpu.pc, 2 * (value == reg_value))
 
     def test_skip_if_reg_equal_val_load_long_exception(self):
         self.cpu.memory[0x0200] = 0xF0
@@ -128,18 +221,17 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0x0204, self.cpu.pc)
 
     def test_skip_if_reg_not_equal_val(self):
+        cpu = self.cpu
+        v = cpu.v
+        skip_if_reg_not_equal_val = cpu.skip_if_reg_not_equal_val
         for register in range(0x10):
             for value in range(0, 0xFF, 0x10):
+                cpu.operand = (register << 8) | value
                 for reg_value in range(0, 0xFF, 0x10):
-                    self.cpu.operand = register << 8
-                    self.cpu.operand += value
-                    self.cpu.v[register] = reg_value
-                    self.cpu.pc = 0
-                    self.cpu.skip_if_reg_not_equal_val()
-                    if value != reg_value:
-                        self.assertEqual(self.cpu.pc, 2)
-                    else:
-                        self.assertEqual(self.cpu.pc, 0)
+                    v[register] = reg_value
+                    cpu.pc = 0
+                    skip_if_reg_not_equal_val()
+                    self.assertEqual(cpu.pc, 2 * (value != reg_value))
 
     def test_skip_if_reg_not_equal_val_load_long_exception(self):
         self.cpu.memory[0x0200] = 0xF0
@@ -155,21 +247,13 @@ class TestChip8CPU(unittest.TestCase):
 
         for reg_1 in range(0x10):
             for reg_2 in range(0x10):
-                self.cpu.operand = reg_1
-                self.cpu.operand <<= 4
-                self.cpu.operand += reg_2
-                self.cpu.operand <<= 4
-
+                self.cpu.operand = (reg_1 << 8) | (reg_2 << 4)
                 self.cpu.pc = 0
-                self.assertEqual(self.cpu.pc, 0)
                 self.cpu.skip_if_reg_equal_reg()
 
                 # If we are testing the same register as the source and the
                 # destination, then a skip WILL occur
-                if reg_1 == reg_2:
-                    self.assertEqual(self.cpu.pc, 2)
-                else:
-                    self.assertEqual(self.cpu.pc, 0)
+                self.assertEqual(self.cpu.pc, 2 * (reg_1 == reg_2))
 
     def test_skip_if_reg_equal_reg_load_long_exception(self):
         self.cpu.memory[0x0200] = 0xF0
@@ -186,9 +270,7 @@ class TestChip8CPU(unittest.TestCase):
             self.assertEqual(self.cpu.v[0x0], 0)
 
         for reg_num in range(0x10):
-            self.cpu.operand = 0x60 + reg_num
-            self.cpu.operand <<= 8
-            self.cpu.operand += val
+            self.cpu.operand = ((0x60 + reg_num) << 8) | val
 
             self.cpu.move_value_to_reg()
 
@@ -202,23 +284,14 @@ class TestChip8CPU(unittest.TestCase):
 
     def test_add_value_to_reg(self):
         for register in range(0x10):
-            for reg_value in range(0, 0xFF, 0x10):
-                for value in range(0, 0xFF, 0x10):
+            for reg_value in BYTE_SAMPLES:
+                for value in BYTE_SAMPLES:
                     self.cpu.v[register] = reg_value
-                    self.cpu.operand = register << 8
-                    self.cpu.operand += value
+                    self.cpu.operand = (register << 8) | value
+                    self.cpu.add_value_to_reg()
                     self.assertEqual(
                         self.cpu.v[register],
-                        reg_value)
-                    self.cpu.add_value_to_reg()
-                    if value + reg_value < 256:
-                        self.assertEqual(
-                            self.cpu.v[register],
-                            value + reg_value)
-                    else:
-                        self.assertEqual(
-                            self.cpu.v[register],
-                            (value + reg_value - 256))
+                        (value + reg_value) & 0xFF)
 
     def test_move_reg_into_reg(self):
         for source in range(0x10):
@@ -226,34 +299,24 @@ class TestChip8CPU(unittest.TestCase):
                 if source != target:
                     self.cpu.v[target] = 0x32
                     self.cpu.v[source] = 0
-                    self.cpu.operand = source << 8
-                    self.cpu.operand += (target << 4)
+                    self.cpu.operand = (source << 8) | (target << 4)
                     self.cpu.move_reg_into_reg()
                     self.assertEqual(self.cpu.v[source], 0x32)
 
     def test_logical_or(self):
+        values = BYTE_SAMPLES
+        expected = np.bitwise_or.outer(values, values)
         for source in range(0x10):
             for target in range(0x10):
                 if source != target:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0, 0xFF, 0x10):
-                            self.cpu.v[source] = source_val
-                            self.cpu.v[target] = target_val
-                            self.cpu.operand = source << 8
-                            self.cpu.operand += (target << 4)
-                            self.cpu.logical_or()
-                            self.assertEqual(
-                                self.cpu.v[source],
-                                source_val | target_val)
+                    self.check_register_operation(
+                        self.cpu.logical_or, source, target, values, values,
+                        expected)
                 else:
-                    for source_val in range(0, 0xFF, 0x10):
-                        self.cpu.v[source] = source_val
-                        self.cpu.operand = source << 8
-                        self.cpu.operand += (target << 4)
-                        self.cpu.logical_or()
-                        self.assertEqual(
-                            self.cpu.v[source],
-                            source_val)
+                    self.cpu.v[source] = 0x5A
+                    self.cpu.operand = (source << 8) | (target << 4)
+                    self.cpu.logical_or()
+                    self.assertEqual(0x5A, self.cpu.v[source])
 
     def test_logical_or_logic_quirks_clears_flag(self):
         self.cpu.v[1] = 0
@@ -266,28 +329,19 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0, self.cpu.v[0xF])
 
     def test_logical_and(self):
+        values = BYTE_SAMPLES
+        expected = np.bitwise_and.outer(values, values)
         for source in range(0x10):
             for target in range(0x10):
                 if source != target:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0, 0xFF, 0x10):
-                            self.cpu.v[source] = source_val
-                            self.cpu.v[target] = target_val
-                            self.cpu.operand = source << 8
-                            self.cpu.operand += (target << 4)
-                            self.cpu.logical_and()
-                            self.assertEqual(
-                                self.cpu.v[source],
-                                source_val & target_val)
+                    self.check_register_operation(
+                        self.cpu.logical_and, source, target, values, values,
+                        expected)
                 else:
-                    for source_val in range(256):
-                        self.cpu.v[source] = source_val
-                        self.cpu.operand = source << 8
-                        self.cpu.operand += (target << 4)
-                        self.cpu.logical_and()
-                        self.assertEqual(
-                            self.cpu.v[source],
-                            source_val)
+                    self.cpu.v[source] = 0x5A
+                    self.cpu.operand = (source << 8) | (target << 4)
+                    self.cpu.logical_and()
+                    self.assertEqual(0x5A, self.cpu.v[source])
 
     def test_logical_and_logic_quirks_clears_flag(self):
         self.cpu.v[1] = 0
@@ -300,19 +354,14 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0, self.cpu.v[0xF])
 
     def test_exclusive_or(self):
+        values = BYTE_SAMPLES
+        expected = np.bitwise_xor.outer(values, values)
         for source in range(0x10):
             for target in range(0x10):
                 if source != target:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0xF):
-                            self.cpu.v[source] = source_val
-                            self.cpu.v[target] = target_val
-                            self.cpu.operand = source << 8
-                            self.cpu.operand += (target << 4)
-                            self.cpu.exclusive_or()
-                            self.assertEqual(
-                                self.cpu.v[source],
-                                source_val ^ target_val)
+                    self.check_register_operation(
+                        self.cpu.exclusive_or, source, target, values, values,
+                        expected)
 
     def test_exclusive_or_logic_quirks_clears_flag(self):
         self.cpu.v[1] = 1
@@ -325,79 +374,77 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0, self.cpu.v[0xF])
 
     def test_add_to_reg(self):
+        values = BYTE_SAMPLES
+        sums = np.add.outer(values, values)
+        expected = sums & 0xFF
+        expected_flags = (sums > 255).astype(np.uint8)
         for source in range(0xF):
             for target in range(0xF):
                 if source != target:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0, 0xFF, 0x10):
-                            self.cpu.v[source] = source_val
-                            self.cpu.v[target] = target_val
-                            self.cpu.operand = source << 8
-                            self.cpu.operand += (target << 4)
-                            self.cpu.add_reg_to_reg()
-                            if source_val + target_val > 255:
-                                self.assertEqual(
-                                    self.cpu.v[source],
-                                    source_val + target_val - 256)
-                                self.assertEqual(
-                                    self.cpu.v[0xF], 1)
-                            else:
-                                self.assertEqual(
-                                    self.cpu.v[source],
-                                    source_val + target_val)
-                                self.assertEqual(
-                                    self.cpu.v[0xF], 0)
+                    self.check_register_operation(
+                        self.cpu.add_reg_to_reg, source, target, values, values,
+                        expected, expected_flags)
 
     def test_subtract_reg_from_reg(self):
+        source_values = range(0, 0xFF, 0x10)
+        # Borrow depends only on the sign of the difference, so a few
+        # values around each boundary cover every case
+        target_values = (0x00, 0x01, 0x0F, 0x10, 0x11, 0x7F, 0x80, 0xFF)
+        differences = np.subtract.outer(source_values, target_values)
+        expected = differences & 0xFF
+        expected_flags = (differences >= 0).astype(np.uint8)
         for source in range(0xF):
             for target in range(0xF):
                 if source != target:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0xF):
-                            self.cpu.v[source] = source_val
-                            self.cpu.v[target] = target_val
-                            self.cpu.operand = source << 8
-                            self.cpu.operand += (target << 4)
-                            self.cpu.subtract_reg_from_reg()
-                            if source_val > target_val:
-                                self.assertEqual(self.cpu.v[source], source_val - target_val)
-                                self.assertEqual(
-                                    self.cpu.v[0xF], 1)
-                            elif source_val == target_val:
-                                self.assertEqual(self.cpu.v[source], 0)
-                                self.assertEqual(self.cpu.v[0xF], 1)
-                            else:
-                                self.assertEqual(self.cpu.v[source], 256 + source_val - target_val)
-                                self.assertEqual(self.cpu.v[0xF], 0)
+                    self.check_register_operation(
+                        self.cpu.subtract_reg_from_reg, source, target,
+                        source_values, target_values,
+                        expected, expected_flags)
 
     def test_right_shift_reg_quirks(self):
         self.cpu.shift_quirks = True
+        v = self.cpu.v
+        right_shift_reg = self.cpu.right_shift_reg
+        values = np.arange(0, 0xFF, 0x10)
+        shifts = np.arange(1, 8)
+        expected = values[:, None] >> shifts
+        expected_flags = (values[:, None] >> (shifts - 1)) & 0x1
         for register in range(0xF):
-            for value in range(0, 0xFF, 0x10):
-                self.cpu.v[register] = value
-                self.cpu.operand = register << 8
-                for index in range(1, 8):
-                    shifted_val = value >> index
-                    self.cpu.v[0xF] = 0
-                    bit_zero = self.cpu.v[register] & 0x1
-                    self.cpu.right_shift_reg()
-                    self.assertEqual(self.cpu.v[register], shifted_val)
-                    self.assertEqual(self.cpu.v[0xF], bit_zero)
+            results = np.zeros_like(expected)
+            flags = np.zeros_like(expected)
+            self.cpu.operand = register << 8
+            for i, value in enumerate(values.tolist()):
+                v[register] = value
+                for j in range(len(shifts)):
+                    v[0xF] = 0
+                    right_shift_reg()
+                    results[i, j] = v[register]
+                    flags[i, j] = v[0xF]
+            with self.subTest(register=register):
+                np.testing.assert_array_equal(expected, results)
+                np.testing.assert_array_equal(expected_flags, flags)
 
     def test_right_shift_reg(self):
         self.cpu.shift_quirks = False
+        v = self.cpu.v
+        right_shift_reg = self.cpu.right_shift_reg
+        values = np.arange(0, 0xFF, 0x10)
+        expected = values >> 1
+        expected_flags = values & 0x1
         for x in range(0xF):
             for y in range(0xF):
-                for value in range(0, 0xFF, 0x10):
-                    self.cpu.operand = x << 8
-                    self.cpu.operand |= y << 4
-                    self.cpu.v[y] = value
-                    shifted_val = value >> 1
-                    self.cpu.v[0xF] = 0
-                    bit_zero = self.cpu.v[y] & 0x1
-                    self.cpu.right_shift_reg()
-                    self.assertEqual(self.cpu.v[x], shifted_val)
-                    self.assertEqual(self.cpu.v[0xF], bit_zero)
+                results = np.zeros_like(expected)
+                flags = np.zeros_like(expected)
+                self.cpu.operand = (x << 8) | (y << 4)
+                for i, value in enumerate(values.tolist()):
+                    v[y] = value
+                    v[0xF] = 0
+                    right_shift_reg()
+                    results[i] = v[x]
+                    flags[i] = v[0xF]
+                with self.subTest(x=x, y=y):
+                    np.testing.assert_array_equal(expected, results)
+                    np.testing.assert_array_equal(expected_flags, flags)
 
     def test_right_shift_reg_y_bug(self):
         self.cpu.shift_quirks = False
@@ -409,55 +456,65 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(1, self.cpu.v[0xF])
 
     def test_subtract_reg_from_reg1(self):
+        source_values = range(0, 0xFF, 0x10)
+        # Borrow depends only on the sign of the difference, so a few
+        # values around each boundary cover every case
+        target_values = (0x00, 0x01, 0x0F, 0x10, 0x11, 0x7F, 0x80, 0xFF)
+        differences = -np.subtract.outer(source_values, target_values)
+        expected = differences & 0xFF
+        expected_flags = (differences >= 0).astype(np.uint8)
         for x in range(0xF):
             for y in range(0xF):
                 if x != y:
-                    for source_val in range(0, 0xFF, 0x10):
-                        for target_val in range(0xF):
-                            self.cpu.v[x] = source_val
-                            self.cpu.v[y] = target_val
-                            self.cpu.operand = x << 8
-                            self.cpu.operand += (y << 4)
-                            self.cpu.subtract_reg_from_reg1()
-                            if target_val > source_val:
-                                self.assertEqual(target_val - source_val, self.cpu.v[x])
-                                self.assertEqual(1, self.cpu.v[0xF])
-                            elif target_val == source_val:
-                                self.assertEqual(0, self.cpu.v[x])
-                                self.assertEqual(1, self.cpu.v[0xF])
-                            else:
-                                self.assertEqual(256 + target_val - source_val, self.cpu.v[x])
-                                self.assertEqual(0, self.cpu.v[0xF])
+                    self.check_register_operation(
+                        self.cpu.subtract_reg_from_reg1, x, y,
+                        source_values, target_values,
+                        expected, expected_flags)
 
     def test_left_shift_reg(self):
         self.cpu.shift_quirks = False
+        v = self.cpu.v
+        left_shift_reg = self.cpu.left_shift_reg
+        values = np.arange(256)
+        expected = (values << 1) & 0xFF
+        expected_flags = (values & 0x80) >> 7
         for x in range(0xF):
             for y in range(0xF):
+                results = np.zeros_like(expected)
+                flags = np.zeros_like(expected)
+                self.cpu.operand = (x << 8) | (y << 4)
                 for value in range(256):
-                    self.cpu.v[y] = value
-                    self.cpu.operand = x << 8
-                    self.cpu.operand |= y << 4
-                    bit_seven = (value & 0x80) >> 7
-                    shifted_val = (value << 1) & 0xFF
-                    self.cpu.v[0xF] = 0
-                    self.cpu.left_shift_reg()
-                    self.assertEqual(shifted_val, self.cpu.v[x])
-                    self.assertEqual(bit_seven, self.cpu.v[0xF])
+                    v[y] = value
+                    v[0xF] = 0
+                    left_shift_reg()
+                    results[value] = v[x]
+                    flags[value] = v[0xF]
+                with self.subTest(x=x, y=y):
+                    np.testing.assert_array_equal(expected, results)
+                    np.testing.assert_array_equal(expected_flags, flags)
 
     def test_left_shift_reg_quirks(self):
         self.cpu.shift_quirks = True
+        v = self.cpu.v
+        left_shift_reg = self.cpu.left_shift_reg
+        values = np.arange(256)
+        shifts = np.arange(1, 8)
+        expected = (values[:, None] << shifts) & 0xFF
+        expected_flags = ((values[:, None] << (shifts - 1)) & 0x80) >> 7
         for x in range(0xF):
+            results = np.zeros_like(expected)
+            flags = np.zeros_like(expected)
+            self.cpu.operand = x << 8
             for value in range(256):
-                self.cpu.v[x] = value
-                self.cpu.operand = x << 8
-                shifted_val = value
-                for index in range(1, 8):
-                    bit_seven = (shifted_val & 0x80) >> 7
-                    shifted_val = (value << index) & 0xFF
-                    self.cpu.v[0xF] = 0
-                    self.cpu.left_shift_reg()
-                    self.assertEqual(shifted_val, self.cpu.v[x])
-                    self.assertEqual(bit_seven, self.cpu.v[0xF])
+                v[x] = value
+                for j in range(len(shifts)):
+                    v[0xF] = 0
+                    left_shift_reg()
+                    results[value, j] = v[x]
+                    flags[value, j] = v[0xF]
+            with self.subTest(x=x):
+                np.testing.assert_array_equal(expected, results)
+                np.testing.assert_array_equal(expected_flags, flags)
 
     def test_skip_if_reg_not_equal_reg(self):
         for register in range(0x10):
@@ -465,14 +522,10 @@ class TestChip8CPU(unittest.TestCase):
 
         for source in range(0x10):
             for target in range(0x10):
-                self.cpu.operand = source << 8
-                self.cpu.operand += (target << 4)
+                self.cpu.operand = (source << 8) | (target << 4)
                 self.cpu.pc = 0
                 self.cpu.skip_if_reg_not_equal_reg()
-                if source != target:
-                    self.assertEqual(self.cpu.pc, 2)
-                else:
-                    self.assertEqual(self.cpu.pc, 0)
+                self.assertEqual(self.cpu.pc, 2 * (source != target))
 
     def test_skip_if_reg_not_equal_reg_load_long_exception(self):
         self.cpu.memory[0x0200] = 0xF0
@@ -484,41 +537,71 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0x0204, self.cpu.pc)
 
     def test_load_index_reg_with_value(self):
-        for value in range(0x10000):
-            self.cpu.operand = value
-            self.cpu.load_index_reg_with_value()
-            self.assertEqual(self.cpu.index, value & 0x0FFF)
+        cpu = self.cpu
+        load_index_reg_with_value = cpu.load_index_reg_with_value
+        values = np.concatenate((
+            np.arange(0x0000, 0x1000),
+            np.arange(0xA000, 0xB000),
+            np.arange(0xF000, 0x10000),
+            (0x1000, 0x1FFF, 0xFFFF),
+        ))
+        results = np.zeros_like(values)
+        for i, value in enumerate(values.tolist()):
+            cpu.operand = value
+            load_index_reg_with_value()
+            results[i] = cpu.index
+        np.testing.assert_array_equal(values & 0x0FFF, results)
 
     def test_jump_to_index_plus_value(self):
-        for index in range(0, 0xFFF, 0x10):
+        cpu = self.cpu
+        v = cpu.v
+        jump_to_register_plus_value = cpu.jump_to_register_plus_value
+        for index in range(0, 0xFF, 0x10):
+            v[0] = index
             for value in range(0, 0xFFF, 0x10):
-                self.cpu.v[0] = index
-                self.cpu.pc = 0
-                self.cpu.operand = value
-                self.cpu.jump_to_register_plus_value()
-                self.assertEqual(index + value, self.cpu.pc)
+                cpu.pc = 0
+                cpu.operand = value
+                jump_to_register_plus_value()
+                self.assertEqual(index + value, cpu.pc)
 
     def test_jump_to_index_plus_value_quirks(self):
-        self.cpu.jump_quirks = True
+        cpu = self.cpu
+        cpu.jump_quirks = True
+        v = cpu.v
+        jump_to_register_plus_value = cpu.jump_to_register_plus_value
         for register in range(0, 0xF):
-            for index in range(0, 0xFFF, 0x10):
+            for index in range(0, 0xFF, 0x10):
+                v[register] = index
                 for value in range(0, 0xFF, 0x10):
-                    self.cpu.v[register] = index
-                    self.cpu.pc = 0
-                    self.cpu.operand = value
-                    self.cpu.operand |= (register << 8)
-                    self.cpu.jump_to_register_plus_value()
-                    self.assertEqual(index + value, self.cpu.pc)
+                    cpu.pc = 0
+                    cpu.operand = (register << 8) | value
+                    jump_to_register_plus_value()
+                    self.assertEqual(index + value, cpu.pc)
 
     def test_generate_random_number(self):
+        random_bytes = np.random.default_rng(0).integers(0, 256, 256, dtype=np.uint8)
+        values = np.arange(0, 0xFF, 0x10, dtype=np.uint8)
+        expected = random_bytes.reshape(0x10, -1) & values
+        self.cpu.random_bytes = random_bytes.tobytes()
+        self.cpu.random_index = 0
+        results = np.zeros_like(expected)
         for register in range(0x10):
-            for value in range(0, 0xFF, 0x10):
-                self.cpu.v[register] = -1
-                self.cpu.operand = register << 8
-                self.cpu.operand += value
+            for i, value in enumerate(values.tolist()):
+                self.cpu.operand = (register << 8) | value
                 self.cpu.generate_random_number()
-                self.assertTrue(self.cpu.v[register] >= 0)
-                self.assertTrue(self.cpu.v[register] <= 255)
+                results[register, i] = self.cpu.v[register]
+        np.testing.assert_array_equal(expected, results)
+
+    def test_generate_random_number_refills_random_bytes(self):
+        self.cpu.random_bytes = bytes([0xAB] * 4096)
+        self.cpu.random_index = 4095
+        self.cpu.operand = 0xC1FF
+        self.cpu.generate_random_number()
+        self.assertEqual(0xAB, self.cpu.v[1])
+        self.assertEqual(4096, self.cpu.random_index)
+        self.cpu.generate_random_number()
+        self.assertEqual(1, self.cpu.random_index)
+        self.assertNotEqual(bytes([0xAB] * 4096), self.cpu.random_bytes)
 
     def test_move_delay_timer_into_reg(self):
         for register in range(0x10):
@@ -556,6 +639,13 @@ class TestChip8CPU(unittest.TestCase):
                 self.cpu.add_reg_into_index()
                 self.assertEqual(index + 0x89, self.cpu.index)
 
+    def test_add_reg_into_index_wraps_at_16_bits(self):
+        self.cpu.index = 0xFFF0
+        self.cpu.v[1] = 0x20
+        self.cpu.operand = 0xF11E
+        self.cpu.add_reg_into_index()
+        self.assertEqual(0x10, self.cpu.index)
+
     def test_load_index_with_reg_sprite(self):
         for number in range(0x10):
             self.cpu.index = 0xFFF
@@ -565,15 +655,14 @@ class TestChip8CPU(unittest.TestCase):
             self.assertEqual(number * 5, self.cpu.index)
 
     def test_store_bcd_in_memory(self):
+        self.cpu.operand = 0xF033
         for number in range(0x100):
-            number_as_string = '{:03d}'.format(number)
             self.cpu.index = 0
             self.cpu.v[0] = number
-            self.cpu.operand = 0xF033
             self.cpu.store_bcd_in_memory()
-            self.assertEqual(int(number_as_string[0]), self.cpu.memory[0])
-            self.assertEqual(int(number_as_string[1]), self.cpu.memory[1])
-            self.assertEqual(int(number_as_string[2]), self.cpu.memory[2])
+            hundreds, remainder = divmod(number, 100)
+            tens, ones = divmod(remainder, 10)
+            self.assertEqual(bytes((hundreds, tens, ones)), self.cpu.memory[0:3])
 
     def test_store_regs_in_memory(self):
         index = 0x500
@@ -585,19 +674,15 @@ class TestChip8CPU(unittest.TestCase):
         for num_regs in range(0x10):
             self.cpu.index = index
 
-            for counter in range(0x10):
-                self.cpu.memory[self.cpu.index + counter] = 0x00
+            self.cpu.memory[index:index + 0x10] = bytes(0x10)
 
             self.cpu.operand = (num_regs << 8)
             index_before = self.cpu.index
             self.cpu.store_regs_in_memory()
             self.assertEqual(self.cpu.index, index_before + num_regs + 1)
 
-            for counter in range(0x10):
-                if counter > num_regs:
-                    self.assertEqual(self.cpu.memory[index + counter], 0x00)
-                else:
-                    self.assertEqual(self.cpu.memory[index + counter], 0x89 + counter)
+            expected = bytes(range(0x89, 0x8A + num_regs)) + bytes(0xF - num_regs)
+            self.assertEqual(expected, self.cpu.memory[index:index + 0x10])
 
     def test_store_regs_in_memory_index_quirks(self):
         self.cpu.index_quirks = True
@@ -610,19 +695,15 @@ class TestChip8CPU(unittest.TestCase):
         for num_regs in range(0x10):
             self.cpu.index = index
 
-            for counter in range(0x10):
-                self.cpu.memory[self.cpu.index + counter] = 0x00
+            self.cpu.memory[index:index + 0x10] = bytes(0x10)
 
             self.cpu.operand = (num_regs << 8)
             index_before = self.cpu.index
             self.cpu.store_regs_in_memory()
             self.assertEqual(self.cpu.index, index_before)
 
-            for counter in range(0x10):
-                if counter > num_regs:
-                    self.assertEqual(self.cpu.memory[index + counter], 0x00)
-                else:
-                    self.assertEqual(self.cpu.memory[index + counter], 0x89 + counter)
+            expected = bytes(range(0x89, 0x8A + num_regs)) + bytes(0xF - num_regs)
+            self.assertEqual(expected, self.cpu.memory[index:index + 0x10])
 
     def test_read_regs_from_memory(self):
         index = 0x500
@@ -633,20 +714,15 @@ class TestChip8CPU(unittest.TestCase):
 
         for num_regs in range(0x10):
             self.cpu.index = index
-            for reg_to_set in range(0x10):
-                self.cpu.v[reg_to_set] = 0
+            self.cpu.v[:] = bytes(0x10)
 
-            self.cpu.operand = 0xF065
-            self.cpu.operand |= (num_regs << 8)
+            self.cpu.operand = 0xF065 | (num_regs << 8)
             index_before = self.cpu.index
             self.cpu.read_regs_from_memory()
             self.assertEqual(self.cpu.index, index_before + num_regs + 1)
 
-            for reg_to_check in range(0x10):
-                if reg_to_check > num_regs:
-                    self.assertEqual(self.cpu.v[reg_to_check], 0)
-                else:
-                    self.assertEqual(self.cpu.v[reg_to_check], reg_to_check + 0x89)
+            expected = bytes(range(0x89, 0x8A + num_regs)) + bytes(0xF - num_regs)
+            self.assertEqual(expected, self.cpu.v)
 
     def test_read_regs_from_memory_index_quirks(self):
         self.cpu.index_quirks = True
@@ -658,48 +734,59 @@ class TestChip8CPU(unittest.TestCase):
 
         for register in range(0x10):
             self.cpu.index = index
-            for reg_to_set in range(0x10):
-                self.cpu.v[reg_to_set] = 0
+            self.cpu.v[:] = bytes(0x10)
 
-            self.cpu.operand = 0xF065
-            self.cpu.operand |= (register << 8)
+            self.cpu.operand = 0xF065 | (register << 8)
             index_before = self.cpu.index
             self.cpu.read_regs_from_memory()
             self.assertEqual(self.cpu.index, index_before)
 
-            for reg_to_check in range(0x10):
-                if reg_to_check > register:
-                    self.assertEqual(self.cpu.v[reg_to_check], 0)
-                else:
-                    self.assertEqual(self.cpu.v[reg_to_check], reg_to_check + 0x89)
+            expected = bytes(range(0x89, 0x8A + register)) + bytes(0xF - register)
+            self.assertEqual(expected, self.cpu.v)
+
+    def test_store_regs_in_memory_past_end_of_memory_raises(self):
+        memory_size = len(self.cpu.memory)
+        self.cpu.index = memory_size - 4
+        self.cpu.operand = 0xFF55
+        with self.assertRaises(IndexError):
+            self.cpu.store_regs_in_memory()
+        self.assertEqual(memory_size, len(self.cpu.memory))
+        self.assertEqual(memory_size - 4, self.cpu.index)
+
+    def test_store_bcd_in_memory_past_end_of_memory_raises(self):
+        memory_size = len(self.cpu.memory)
+        self.cpu.index = memory_size - 1
+        self.cpu.v[0] = 123
+        self.cpu.operand = 0xF033
+        with self.assertRaises(IndexError):
+            self.cpu.store_bcd_in_memory()
+        self.assertEqual(memory_size, len(self.cpu.memory))
+
+    def test_read_regs_from_memory_past_end_of_memory_raises(self):
+        self.cpu.index = len(self.cpu.memory) - 4
+        self.cpu.operand = 0xFF65
+        with self.assertRaises(IndexError):
+            self.cpu.read_regs_from_memory()
+        self.assertEqual(0x10, len(self.cpu.v))
 
     def test_store_regs_in_rpl(self):
         for register in range(0x10):
             self.cpu.v[register] = register
             self.cpu.operand = (register << 8)
             self.cpu.store_regs_in_rpl()
-            for counter in range(register):
-                self.assertEqual(counter, self.cpu.rpl[counter])
+            self.assertEqual(bytes(range(register + 1)), self.cpu.rpl[:register + 1])
 
     def test_read_regs_from_rpl(self):
         for register in range(0xF):
             self.cpu.rpl[register] = register + 0x89
 
         for register in range(0xF):
-            for reg_to_set in range(0xF):
-                self.cpu.v[reg_to_set] = 0
+            self.cpu.v[:0xF] = bytes(0xF)
 
-            self.cpu.operand = 0xF000
-            self.cpu.operand += (register << 8)
-            self.cpu.operand += 0x85
+            self.cpu.operand = 0xF085 | (register << 8)
             self.cpu.read_regs_from_rpl()
-            for reg_to_check in range(0xF):
-                if reg_to_check > register:
-                    self.assertEqual(self.cpu.v[reg_to_check], 0)
-                else:
-                    self.assertEqual(
-                        self.cpu.v[reg_to_check],
-                        reg_to_check + 0x89)
+            expected = bytes(range(0x89, 0x8A + register)) + bytes(0xE - register)
+            self.assertEqual(expected, self.cpu.v[:0xF])
 
     def test_load_rom(self):
         self.cpu.load_rom('test/romfile', 0)
@@ -711,6 +798,16 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(ord('f'), self.cpu.memory[5])
         self.assertEqual(ord('g'), self.cpu.memory[6])
 
+    def test_load_rom_larger_than_memory_raises(self):
+        memory_size = len(self.cpu.memory)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "oversized.ch8")
+            with open(filename, "wb") as rom_file:
+                rom_file.write(bytes(memory_size - 0x1FF))
+            with self.assertRaises(IndexError):
+                self.cpu.load_rom(filename)
+        self.assertEqual(memory_size, len(self.cpu.memory))
+
     def test_decrement_timers_decrements_by_one(self):
         self.cpu.delay = 2
         self.cpu.sound = 2
@@ -725,6 +822,13 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0, self.cpu.delay)
         self.assertEqual(0, self.cpu.sound)
 
+    def test_decrement_timers_decrements_sound_when_delay_is_zero(self):
+        self.cpu.delay = 0
+        self.cpu.sound = 2
+        self.cpu.decrement_timers()
+        self.assertEqual(0, self.cpu.delay)
+        self.assertEqual(1, self.cpu.sound)
+
     def test_clear_screen(self):
         self.cpu.operand = 0xE0
         self.cpu.clear_return()
@@ -745,66 +849,76 @@ class TestChip8CPU(unittest.TestCase):
         self.cpu.operand = 0x09E
         self.cpu.v[0] = 1
         self.cpu.pc = 0
-        result_table = [False] * 512
-        result_table[pygame.K_1] = True
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(2, self.cpu.pc)
+        self.key_mock.return_value = KEY_1_PRESSED_TABLE
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(2, self.cpu.pc)
+
+    def test_operation_9E_uses_refreshed_keys(self):
+        self.cpu.operand = 0x09E
+        self.cpu.v[0] = 1
+        self.cpu.pc = 0
+        self.key_mock.return_value = KEY_1_PRESSED_TABLE
+        self.cpu.refresh_keys()
+        self.cpu.keyboard_routines()
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(4, self.cpu.pc)
 
     def test_operation_9E_pc_skips_if_key_pressed_load_long_exception(self):
         self.cpu.operand = 0x09E
         self.cpu.v[0] = 1
-        result_table = [False] * 512
         self.cpu.memory[0x0200] = 0xF0
         self.cpu.memory[0x0201] = 0x00
-        result_table[pygame.K_1] = True
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(0x0204, self.cpu.pc)
+        self.key_mock.return_value = KEY_1_PRESSED_TABLE
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(0x0204, self.cpu.pc)
 
     def test_operation_9E_pc_does_not_skip_if_key_not_pressed(self):
         self.cpu.operand = 0x09E
         self.cpu.v[0] = 1
         self.cpu.pc = 0
-        result_table = [False] * 512
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(0, self.cpu.pc)
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(0, self.cpu.pc)
 
     def test_operation_A1_pc_skips_if_key_not_pressed(self):
         self.cpu.operand = 0x0A1
         self.cpu.v[0] = 1
         self.cpu.pc = 0
-        result_table = [False] * 512
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(2, self.cpu.pc)
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(2, self.cpu.pc)
 
     def test_operation_A1_pc_skips_if_key_not_pressed_load_long_exception(self):
         self.cpu.operand = 0x0A1
         self.cpu.v[0] = 1
-        result_table = [False] * 512
         self.cpu.memory[0x0200] = 0xF0
         self.cpu.memory[0x0201] = 0x00
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(0x0204, self.cpu.pc)
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(0x0204, self.cpu.pc)
 
     def test_operation_A1_pc_does_not_skip_if_key_pressed(self):
         self.cpu.operand = 0x0A1
         self.cpu.v[0] = 1
         self.cpu.pc = 0
-        result_table = [False] * 512
-        result_table[pygame.K_1] = True
-        with mock.patch("pygame.key.get_pressed", return_value=result_table) as key_mock:
-            self.cpu.keyboard_routines()
-            self.assertTrue(key_mock.asssert_called)
-            self.assertEqual(0, self.cpu.pc)
+        self.key_mock.return_value = KEY_1_PRESSED_TABLE
+        self.cpu.keyboard_routines()
+        self.key_mock.assert_called_once_with()
+        self.assertEqual(0, self.cpu.pc)
+
+    def test_draw_sprite_past_end_of_memory_raises(self):
+        self.screen.get_height.return_value = 64
+        self.screen.get_width.return_value = 128
+        for operand in (0xD125, 0xD120):
+            with self.subTest(operand=hex(operand)):
+                self.cpu.index = len(self.cpu.memory) - 2
+                self.cpu.operand = operand
+                with self.assertRaises(IndexError):
+                    self.cpu.draw_sprite()
+        self.screen.xor_sprite.assert_not_called()
 
     def test_draw_zero_bytes_vf_not_set(self):
         self.cpu.operand = 0x00
@@ -812,7 +926,7 @@ class TestChip8CPU(unittest.TestCase):
         self.screen.get_height.return_value = 64
         self.screen.get_width.return_value = 128
         self.cpu.draw_sprite()
-        self.assertTrue(self.screen.update_screen.assert_called)
+        self.screen.update.assert_not_called()
         self.assertEqual(0, self.cpu.v[0xF])
 
     def test_execute_instruction_raises_exception_on_unknown_op_code(self):
@@ -833,17 +947,54 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(0x6100, result)
         self.assertEqual(0x202, self.cpu.pc)
 
+    def test_operand_decodes_fields(self):
+        self.cpu.operand = 0xD123
+        self.assertEqual(0xD123, self.cpu.operand)
+        self.assertEqual(0x1, self.cpu.x)
+        self.assertEqual(0x2, self.cpu.y)
+        self.assertEqual(0x3, self.cpu.n)
+        self.assertEqual(0x23, self.cpu.nn)
+        self.assertEqual(0x123, self.cpu.nnn)
+
+    def test_execute_instruction_caches_decoded_operand(self):
+        self.cpu.pc = 0x200
+        self.cpu.memory[0x200] = 0x61
+        self.cpu.memory[0x201] = 0x23
+        self.cpu.execute_instruction()
+        self.assertEqual((self.cpu.move_value_to_reg, 0x6123, 1, 2, 3, 0x23, 0x123), self.cpu.decode_cache[0x200])
+        self.assertEqual(0x23, self.cpu.v[1])
+
+    def test_decode_resolves_subfunction(self):
+        self.cpu.memory[0x200] = 0xF1
+        self.cpu.memory[0x201] = 0x65
+        self.assertEqual(self.cpu.read_regs_from_memory, self.cpu.decode(0x200)[0])
+        self.cpu.memory[0x200] = 0x81
+        self.cpu.memory[0x201] = 0x24
+        self.assertEqual(self.cpu.add_reg_to_reg, self.cpu.decode(0x200)[0])
+        self.cpu.memory[0x200] = 0x81
+        self.cpu.memory[0x201] = 0x28
+        self.assertEqual(self.cpu.execute_logical_instruction, self.cpu.decode(0x200)[0])
+
+    def test_store_regs_in_memory_invalidates_decode_cache(self):
+        self.cpu.pc = 0x200
+        self.cpu.memory[0x200] = 0x61
+        self.cpu.memory[0x201] = 0x23
+        self.cpu.execute_instruction()
+        self.cpu.index = 0x201
+        self.cpu.v[0] = 0x45
+        self.cpu.operand = 0xF055
+        self.cpu.store_regs_in_memory()
+        self.assertIsNone(self.cpu.decode_cache[0x200])
+        self.cpu.pc = 0x200
+        self.cpu.execute_instruction()
+        self.assertEqual(0x45, self.cpu.v[1])
+
     def test_execute_logical_instruction_raises_exception_on_unknown_op_codes(self):
-        for x in range(8, 14):
+        for x in (0x8, 0x9, 0xA, 0xB, 0xC, 0xD, 0xF):
             self.cpu.operand = x
             with self.assertRaises(UnknownOpCodeException):
                 self.cpu.execute_logical_instruction()
 
-        # And finally test 15 (F)
-        self.cpu.operand = 15
-        with self.assertRaises(UnknownOpCodeException):
-            self.cpu.execute_logical_instruction()
-
     def test_misc_routines_raises_exception_on_unknown_op_codes(self):
         self.cpu.operand = 0xF0FF
         with self.assertRaises(UnknownOpCodeException) as context:
@@ -902,8 +1053,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertTrue(self.cpu_spy.draw_extended.assert_called)
 
     def test_draw_sprite_normal_bitplane_1_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -932,8 +1082,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(7, 0, 2))
 
     def test_draw_sprite_extended_bitplane_1_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -994,8 +1143,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(15, 0, 2))
 
     def test_draw_sprite_normal_bitplane_2_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -1026,8 +1174,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(7, 0, 2))
 
     def test_draw_sprite_extended_bitplane_2_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -1088,8 +1235,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(15, 0, 1))
 
     def test_draw_sprite_normal_bitplane_3_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -1121,8 +1267,7 @@ class TestChip8CPU(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(7, 0, 2))
 
     def test_draw_sprite_extended_bitplane_3_integration_correct(self):
-        self.screen = Chip8Screen(2)
-        self.screen.init_display()
+        self.screen = self.get_display_screen()
         self.cpu = Chip8CPU(self.screen)
 
         self.cpu.memory[0x0200] = 0xD0
@@ -1235,86 +1380,67 @@ class TestChip8CPU(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(15, 0, 2))
 
     def test_draw_sprite_draws_correct_sprite(self):
-        screen = Chip8Screen(2)
-        screen.init_display()
-        screen_mock = mock.Mock(wraps=screen, spec=screen)
-        screen_mock.height = 32
-        screen_mock.width = 64
-        self.cpu = Chip8CPU(screen_mock)
+        screen = self.get_display_screen()
+        self.cpu = Chip8CPU(screen)
         self.cpu.memory[0] = 0xAA
         self.cpu.draw_normal(0, 0, 1, 1)
-        with patch('chip8.screen.Chip8Screen.draw_pixel'):
-            screen_mock.draw_pixel.assert_has_calls([
-                call(0, 0, 1, 1),
-                call(1, 0, 0, 1),
-                call(2, 0, 1, 1),
-                call(3, 0, 0, 1),
-                call(4, 0, 1, 1),
-                call(5, 0, 0, 1),
-                call(6, 0, 1, 1),
-                call(7, 0, 0, 1)
-            ])
+        for x_pos in range(8):
+            self.assertEqual(x_pos % 2 == 0, screen.get_pixel(x_pos, 0, 1))
+            self.assertFalse(screen.get_pixel(x_pos, 0, 2))
 
     def test_draw_sprite_turns_off_pixels(self):
-        screen = Chip8Screen(2)
-        screen.init_display()
-        screen_mock = mock.Mock(wraps=screen, spec=screen)
-        screen_mock.height = 32
-        screen_mock.width = 64
-        self.cpu = Chip8CPU(screen_mock)
+        screen = self.get_display_screen()
+        self.cpu = Chip8CPU(screen)
         self.cpu.memory[0] = 0xAA
         self.cpu.draw_normal(0, 0, 1, 1)
         self.cpu.draw_normal(0, 0, 1, 1)
-        with patch('chip8.screen.Chip8Screen.draw_pixel'):
-            screen_mock.draw_pixel.assert_has_calls([
-                call(0, 0, 1, 1),
-                call(1, 0, 0, 1),
-                call(2, 0, 1, 1),
-                call(3, 0, 0, 1),
-                call(4, 0, 1, 1),
-                call(5, 0, 0, 1),
-                call(6, 0, 1, 1),
-                call(7, 0, 0, 1),
-                call(0, 0, 0, 1),
-                call(1, 0, 0, 1),
-                call(2, 0, 0, 1),
-                call(3, 0, 0, 1),
-                call(4, 0, 0, 1),
-                call(5, 0, 0, 1),
-                call(6, 0, 0, 1),
-                call(7, 0, 0, 1)
-            ])
+        for x_pos in range(8):
+            self.assertFalse(screen.get_pixel(x_pos, 0, 1))
+        self.assertEqual(1, self.cpu.v[0xF])
 
     def test_draw_sprite_does_not_turn_off_pixels(self):
-        screen = Chip8Screen(2)
-        screen.init_display()
-        screen_mock = mock.Mock(wraps=screen, spec=screen)
-        screen_mock.height = 32
-        screen_mock.width = 64
-        self.cpu = Chip8CPU(screen_mock)
+        screen = self.get_display_screen()
+        self.cpu = Chip8CPU(screen)
         self.cpu.memory[0] = 0xAA
         self.cpu.draw_normal(0, 0, 1, 1)
         self.cpu.memory[0] = 0x55
         self.cpu.draw_normal(0, 0, 1, 1)
-        with patch('chip8.screen.Chip8Screen.draw_pixel'):
-            screen_mock.draw_pixel.assert_has_calls([
-                call(0, 0, 1, 1),
-                call(1, 0, 0, 1),
-                call(2, 0, 1, 1),
-                call(3, 0, 0, 1),
-                call(4, 0, 1, 1),
-                call(5, 0, 0, 1),
-                call(6, 0, 1, 1),
-                call(7, 0, 0, 1),
-                call(0, 0, 1, 1),
-                call(1, 0, 1, 1),
-                call(2, 0, 1, 1),
-                call(3, 0, 1, 1),
-                call(4, 0, 1, 1),
-                call(5, 0, 1, 1),
-                call(6, 0, 1, 1),
-                call(7, 0, 1, 1)
-            ])
+        for x_pos in range(8):
+            self.assertTrue(screen.get_pixel(x_pos, 0, 1))
+        self.assertEqual(0, self.cpu.v[0xF])
+
+    def test_draw_extended_counts_clipped_rows(self):
+        screen = self.get_display_screen()
+        screen.set_extended()
+        self.cpu = Chip8CPU(screen)
+        self.cpu.memory[0] = 0xFF
+        self.cpu.draw_extended(0, 60, 1)
+        self.assertEqual(24, self.cpu.v[0xF])
+        self.assertTrue(screen.get_pixel(0, 60, 1))
+        self.assertFalse(screen.get_pixel(0, 0, 1))
+
+    def test_draw_sprite_keeps_other_bitplane(self):
+        screen = self.get_display_screen()
+        self.cpu = Chip8CPU(screen)
+        screen.draw_pixel(0, 0, True, 2)
+        self.cpu.memory[0] = 0x80
+        self.cpu.draw_normal(0, 0, 1, 1)
+        self.assertTrue(screen.get_pixel(0, 0, 1))
+        self.assertTrue(screen.get_pixel(0, 0, 2))
+        self.assertEqual(0, self.cpu.v[0xF])
+
+    def test_draw_sprite_sets_vf_on_collision(self):
+        screen = self.get_display_screen()
+        self.cpu = Chip8CPU(screen)
+        self.cpu.memory[0x5000] = 0x81
+        self.cpu.index = 0x5000
+        self.cpu.operand = 0xD011
+        self.cpu.draw_sprite()
+        self.assertEqual(0, self.cpu.v[0xF])
+        self.cpu.draw_sprite()
+        self.assertEqual(1, self.cpu.v[0xF])
+        self.assertFalse(screen.get_pixel(0, 0, 1))
+        self.assertFalse(screen.get_pixel(7, 0, 1))
 
     def test_load_index_with_sprite(self):
         self.cpu.v[1] = 10
@@ -1322,6 +1448,24 @@ class TestChip8CPU(unittest.TestCase):
         self.cpu.load_index_with_extended_reg_sprite()
         self.assertEqual(100, self.cpu.index)
 
+    def test_last_op_not_recorded_without_trace(self):
+        self.cpu.operand = 0x6123
+        self.cpu.move_value_to_reg()
+        self.assertEqual("None", self.cpu.last_op)
+
+    def test_last_op_recorded_with_trace(self):
+        self.cpu = Chip8CPU(self.screen, trace=True)
+        self.cpu.operand = 0x6123
+        self.cpu.move_value_to_reg()
+        self.assertEqual("LOAD V1, 23", self.cpu.last_op)
+
+    def test_last_pc_recorded_with_trace(self):
+        self.cpu = Chip8CPU(self.screen, trace=True)
+        self.cpu.pc = 0x200
+        self.cpu.memory[0x200] = 0x61
+        self.cpu.execute_instruction()
+        self.assertEqual(0x200, self.cpu.last_pc)
+
     def test_str_function(self):
         self.cpu.v[0] = 0
         self.cpu.v[1] = 1
@@ -1354,6 +1498,36 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(1, self.cpu.keypress_register)
         self.assertTrue(self.cpu.awaiting_keypress)
 
+    def test_decode_keypress_and_continue_stores_key(self):
+        self.cpu.awaiting_keypress = True
+        self.cpu.keypress_register = 3
+        keys_pressed = [False] * 512
+        keys_pressed[KEY_MAPPINGS[0xA]] = True
+        self.cpu.decode_keypress_and_continue(keys_pressed)
+        self.assertEqual(0xA, self.cpu.v[3])
+        self.assertFalse(self.cpu.awaiting_keypress)
+
+    def test_decode_keypress_and_continue_keeps_waiting_without_key(self):
+        self.cpu.awaiting_keypress = True
+        self.cpu.keypress_register = 3
+        self.cpu.decode_keypress_and_continue([False] * 512)
+        self.assertEqual(0, self.cpu.v[3])
+        self.assertTrue(self.cpu.awaiting_keypress)
+
+    def test_decode_single_keypress_stores_key(self):
+        self.cpu.awaiting_keypress = True
+        self.cpu.keypress_register = 3
+        self.cpu.decode_single_keypress(KEY_MAPPINGS[0xA])
+        self.assertEqual(0xA, self.cpu.v[3])
+        self.assertFalse(self.cpu.awaiting_keypress)
+
+    def test_decode_single_keypress_ignores_other_keys(self):
+        self.cpu.awaiting_keypress = True
+        self.cpu.keypress_register = 3
+        self.cpu.decode_single_keypress(pygame.K_ESCAPE)
+        self.assertEqual(0, self.cpu.v[3])
+        self.assertTrue(self.cpu.awaiting_keypress)
+
     def test_store_subset_regs_one_two(self):
         self.cpu.v[1] = 5
         self.cpu.v[2] = 6
@@ -1383,6 +1557,17 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(6, self.cpu.memory[0x5001])
         self.assertEqual(5, self.cpu.memory[0x5002])
 
+    def test_store_subset_regs_two_zero(self):
+        self.cpu.v[0] = 5
+        self.cpu.v[1] = 6
+        self.cpu.v[2] = 7
+        self.cpu.index = 0x5000
+        self.cpu.operand = 0x5202
+        self.cpu.store_subset_regs_in_memory()
+        self.assertEqual(7, self.cpu.memory[0x5000])
+        self.assertEqual(6, self.cpu.memory[0x5001])
+        self.assertEqual(5, self.cpu.memory[0x5002])
+
     def test_store_subset_regs_integration(self):
         self.cpu.v[1] = 5
         self.cpu.v[2] = 6
@@ -1395,6 +1580,25 @@ class TestChip8CPU(unittest.TestCase):
         self.assertEqual(6, self.cpu.memory[0x5001])
         self.assertEqual(5, self.cpu.memory[0x5002])
 
+    def test_store_subset_regs_past_end_of_memory_raises(self):
+        memory_size = len(self.cpu.memory)
+        for operand in (0x5F02, 0x50F2):
+            with self.subTest(operand=hex(operand)):
+                self.cpu.index = memory_size - 4
+                self.cpu.operand = operand
+                with self.assertRaises(IndexError):
+                    self.cpu.store_subset_regs_in_memory()
+                self.assertEqual(memory_size, len(self.cpu.memory))
+
+    def test_read_subset_regs_past_end_of_memory_raises(self):
+        for operand in (0x5F03, 0x50F3):
+            with self.subTest(operand=hex(operand)):
+                self.cpu.index = len(self.cpu.memory) - 4
+                self.cpu.operand = operand
+                with self.assertRaises(IndexError):
+                    self.cpu.read_subset_regs_in_memory()
+                self.assertEqual(0x10, len(self.cpu.v))
+
     def test_readsubset_regs_one_two(self):
         self.cpu.v[1] = 5
         self.cpu.v[2] = 6
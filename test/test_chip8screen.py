@@ -6,10 +6,18 @@ A simple Chip 8 emulator - see the README file for more information.
 """
 # I M P O R T S ###############################################################
 
+import numpy as np
 import unittest
 
+from pygame import display
+
 from chip8.screen import Chip8Screen
 
+# C O N S T A N T S ###########################################################
+
+# The coordinates of every pixel on the normal mode screen
+NORMAL_Y_COORDS, NORMAL_X_COORDS = np.indices((32, 64)).reshape(2, -1)
+
 # C L A S S E S ###############################################################
 
 
@@ -17,11 +25,49 @@ class TestChip8Screen(unittest.TestCase):
     """
     A test class for the Chip 8 Screen.
     """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Creates the screen and initializes the display once for the whole
+        test case. Each test gets the same screen, reset in setUp.
+        """
+        cls.screen = Chip8Screen(2)
+        cls.screen.init_display()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Shuts down the display shared by the tests.
+        """
+        display.quit()
+
     def setUp(self):
         """
-        Common setup routines needed for all unit tests.
+        Common setup routines needed for all unit tests. The shared screen
+        is returned to a blank screen in normal mode.
+        """
+        self.screen.set_normal()
+        self.screen.clear_screen(3)
+
+    def fill_bitplane(self, bitplane):
+        """
+        Turns on every pixel of the normal mode screen on the specified
+        bitplane. The bitplane must be blank, since the pixels are XORed on
+        with a single xor_sprite call.
+
+        :param bitplane: the bitplane to draw the pixels on
         """
-        self.screen = Chip8Screen(2)
+        self.screen.xor_sprite(NORMAL_X_COORDS, NORMAL_Y_COORDS, bitplane)
+
+    def get_bitplane(self, bitplane):
+        """
+        Returns the state of every visible pixel on the specified bitplane,
+        so that a whole screen can be checked in one assertion.
+
+        :param bitplane: the bitplane to read
+        :return: a boolean array that is True where the pixel is turned on
+        """
+        return (self.screen.visible_pixels & bitplane) == bitplane
 
     def test_get_width_normal(self):
         self.assertEqual(64, self.screen.get_width())
@@ -33,86 +79,94 @@ class TestChip8Screen(unittest.TestCase):
     def test_get_height_normal(self):
         self.assertEqual(32, self.screen.get_height())
 
+    def test_set_extended_keeps_pixels_on_display(self):
+        self.screen.draw_pixel(1, 1, 1, 1)
+        self.screen.set_extended()
+        self.assertFalse(self.screen.get_pixel(1, 1, 1))
+        self.assertTrue(self.screen.get_pixel(2, 2, 1))
+        self.assertTrue(self.screen.get_pixel(3, 3, 1))
+        self.screen.set_normal()
+        self.assertTrue(self.screen.get_pixel(1, 1, 1))
+
+    def test_update_draws_pixels_to_display(self):
+        self.screen.draw_pixel(1, 1, 1, 1)
+        self.screen.draw_pixel(2, 1, 1, 2)
+        self.screen.update()
+        self.assertEqual(self.screen.pixel_colors[1], self.screen.surface.get_at((4, 4)))
+        self.assertEqual(self.screen.pixel_colors[2], self.screen.surface.get_at((8, 4)))
+        self.assertEqual(self.screen.pixel_colors[0], self.screen.surface.get_at((0, 0)))
+
+    def test_xor_sprite_returns_collisions(self):
+        self.screen.draw_pixel(2, 3, 1, 1)
+        self.screen.draw_pixel(4, 3, 1, 2)
+        collisions = self.screen.xor_sprite(np.array([1, 2, 4, 1]), np.array([3, 3, 3, 4]), 1)
+        self.assertEqual(1, collisions)
+        self.assertTrue(self.screen.get_pixel(1, 3, 1))
+        self.assertFalse(self.screen.get_pixel(2, 3, 1))
+        self.assertTrue(self.screen.get_pixel(4, 3, 1))
+        self.assertTrue(self.screen.get_pixel(4, 3, 2))
+        self.assertTrue(self.screen.get_pixel(1, 4, 1))
+
+    def test_init_display_uses_32_bit_surface(self):
+        self.screen.init_display()
+        self.assertEqual(32, self.screen.surface.get_bitsize())
+
     def test_get_height_extended(self):
         self.screen.set_extended()
         self.assertEqual(64, self.screen.get_height())
 
     def test_all_pixels_off_on_screen_init(self):
-        self.screen.init_display()
-        for x_pos in range(64):
-            for y_pos in range(32):
-                self.assertEqual(0, self.screen.get_pixel(x_pos, y_pos, 1))
-                self.assertEqual(0, self.screen.get_pixel(x_pos, y_pos, 2))
+        self.assertFalse(self.get_bitplane(1).any())
+        self.assertFalse(self.get_bitplane(2).any())
 
     def test_get_pixel_on_bitplane_0_returns_false(self):
-        self.screen.init_display()
+        self.fill_bitplane(3)
         for xpos in range(64):
             for ypos in range(32):
-                self.screen.draw_pixel(xpos, ypos, 1, 1)
-                self.screen.draw_pixel(xpos, ypos, 1, 2)
                 self.assertFalse(self.screen.get_pixel(xpos, ypos, 0))
 
     def test_write_pixel_turns_on_pixel_on_bitplane(self):
-        self.screen.init_display()
         for xpos in range(64):
             for ypos in range(32):
                 self.screen.draw_pixel(xpos, ypos, 1, 1)
-                self.assertTrue(self.screen.get_pixel(xpos, ypos, 1))
-                self.assertFalse(self.screen.get_pixel(xpos, ypos, 2))
+        self.assertTrue(self.get_bitplane(1).all())
+        self.assertFalse(self.get_bitplane(2).any())
 
     def test_write_pixel_turns_on_pixel_on_both_bitplanes(self):
-        self.screen.init_display()
         for xpos in range(64):
             for ypos in range(32):
                 self.screen.draw_pixel(xpos, ypos, 1, 3)
-                self.assertTrue(self.screen.get_pixel(xpos, ypos, 1))
-                self.assertTrue(self.screen.get_pixel(xpos, ypos, 2))
+        self.assertTrue(self.get_bitplane(1).all())
+        self.assertTrue(self.get_bitplane(2).all())
 
     def test_write_pixel_does_nothing_on_bitplane_0(self):
-        self.screen.init_display()
         for xpos in range(64):
             for ypos in range(32):
                 self.screen.draw_pixel(xpos, ypos, 1, 0)
-                self.assertFalse(self.screen.get_pixel(xpos, ypos, 1))
-                self.assertFalse(self.screen.get_pixel(xpos, ypos, 2))
+        self.assertFalse(self.get_bitplane(1).any())
+        self.assertFalse(self.get_bitplane(2).any())
 
     def test_clear_screen_clears_pixels_on_bitplane_1(self):
-        self.screen.init_display()
-        for x_pos in range(64):
-            for y_pos in range(32):
-                self.screen.draw_pixel(x_pos, y_pos, 1, 1)
+        self.fill_bitplane(1)
         self.screen.clear_screen(1)
-        for x_pos in range(64):
-            for y_pos in range(32):
-                self.assertFalse(self.screen.get_pixel(x_pos, y_pos, 1))
-                self.assertFalse(self.screen.get_pixel(x_pos, y_pos, 2))
+        self.assertFalse(self.get_bitplane(1).any())
+        self.assertFalse(self.get_bitplane(2).any())
 
     def test_clear_screen_clears_pixels_on_bitplane_1_only_when_both_set(self):
-        self.screen.init_display()
-        for x_pos in range(64):
-            for y_pos in range(32):
-                self.screen.draw_pixel(x_pos, y_pos, 1, 1)
-                self.screen.draw_pixel(x_pos, y_pos, 1, 2)
+        self.fill_bitplane(1)
+        self.fill_bitplane(2)
         self.screen.clear_screen(1)
-        for x_pos in range(64):
-            for y_pos in range(32):
-                self.assertFalse(self.screen.get_pixel(x_pos, y_pos, 1))
-                self.assertTrue(self.screen.get_pixel(x_pos, y_pos, 2))
+        self.assertFalse(self.get_bitplane(1).any())
+        self.assertTrue(self.get_bitplane(2).all())
 
     def test_clear_screen_on_bitplane_0_does_nothing(self):
-        self.screen.init_display()
-        for xpos in range(64):
-            for ypos in range(32):
-                self.screen.draw_pixel(xpos, ypos, 1, 1)
-                self.screen.draw_pixel(xpos, ypos, 1, 2)
+        self.fill_bitplane(1)
+        self.fill_bitplane(2)
         self.screen.clear_screen(0)
-        for xpos in range(64):
-            for ypos in range(32):
-                self.assertTrue(self.screen.get_pixel(xpos, ypos, 1))
-                self.assertTrue(self.screen.get_pixel(xpos, ypos, 2))
+        self.assertTrue(self.get_bitplane(1).all())
+        self.assertTrue(self.get_bitplane(2).all())
 
     def test_scroll_down_bitplane_0_does_nothing(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -124,7 +178,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_up_bitplane_0_does_nothing(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 1, 1, 1)
         self.screen.draw_pixel(0, 1, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 1, 1))
@@ -136,7 +189,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_down_bitplane_1(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
         self.assertFalse(self.screen.get_pixel(0, 0, 2))
@@ -147,7 +199,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_up_bitplane_1(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 1, 1, 1)
         self.assertTrue(self.screen.get_pixel(0, 1, 1))
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
@@ -158,7 +209,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_down_bitplane_1_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -170,7 +220,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_up_bitplane_1_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 1, 1, 1)
         self.screen.draw_pixel(0, 1, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 1, 1))
@@ -182,7 +231,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_down_bitplane_3_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -194,7 +242,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_up_bitplane_3_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 1, 1, 1)
         self.screen.draw_pixel(0, 1, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 1, 1))
@@ -206,7 +253,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(0, 1, 2))
 
     def test_scroll_right_bitplane_0_does_nothing(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -224,7 +270,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(4, 0, 2))
 
     def test_scroll_right_bitplane_1(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
         self.assertFalse(self.screen.get_pixel(0, 0, 2))
@@ -241,7 +286,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(4, 0, 2))
 
     def test_scroll_right_bitplane_1_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -259,7 +303,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(4, 0, 2))
 
     def test_scroll_right_bitplane_3_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(0, 0, 1, 1)
         self.screen.draw_pixel(0, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(0, 0, 1))
@@ -277,7 +320,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(4, 0, 2))
 
     def test_scroll_left_bitplane_0_does_nothing(self):
-        self.screen.init_display()
         self.screen.draw_pixel(63, 0, 1, 1)
         self.screen.draw_pixel(63, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(63, 0, 1))
@@ -295,7 +337,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(59, 0, 2))
 
     def test_scroll_left_bitplane_1(self):
-        self.screen.init_display()
         self.screen.draw_pixel(63, 0, 1, 1)
         self.assertTrue(self.screen.get_pixel(63, 0, 1))
         self.assertFalse(self.screen.get_pixel(63, 0, 2))
@@ -312,7 +353,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(59, 0, 2))
 
     def test_scroll_left_bitplane_1_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(63, 0, 1, 1)
         self.screen.draw_pixel(63, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(63, 0, 1))
@@ -330,7 +370,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertFalse(self.screen.get_pixel(59, 0, 2))
 
     def test_scroll_left_bitplane_3_both_pixels_active(self):
-        self.screen.init_display()
         self.screen.draw_pixel(63, 0, 1, 1)
         self.screen.draw_pixel(63, 0, 1, 2)
         self.assertTrue(self.screen.get_pixel(63, 0, 1))
@@ -348,7 +387,6 @@ class TestChip8Screen(unittest.TestCase):
         self.assertTrue(self.screen.get_pixel(59, 0, 2))
 
     def test_set_normal(self):
-        self.screen.init_display()
         self.screen.set_extended()
         self.screen.set_normal()
         self.assertEqual(64, self.screen.get_width())
@@ -80,6 +80,10 @@ def parse_arguments():
         "--color_3", help="the hex color to use for bitplane overlaps (default=FFFFFF)",
         dest="color_3", default="FFFFFF"
     )
+    parser.add_argument(
+        "--profile", help="profile the emulator and write the statistics "
+        "to the specified file", dest="profile", default=None
+    )
     return parser.parse_args()
 
 
@@ -87,6 +91,15 @@ def parse_arguments():
 
 if __name__ == "__main__":
     from chip8.emulator import main_loop
-    main_loop(parse_arguments())
+    args = parse_arguments()
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(main_loop, args)
+        finally:
+            profiler.dump_stats(args.profile)
+    else:
+        main_loop(args)
 
 # E N D   O F   F I L E #######################################################